@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import asyncio
+import heapq
 import logging
 
 # Import routers
@@ -11,14 +12,39 @@ from backend.services.blockchain_response_engine import connect_and_load_contrac
 from backend.services.dao_interactor import connect_and_load_dao_contract, dao_is_connected_and_configured
 from backend.services.ai_pipeline import get_pipeline
 from backend.services.ws_broadcaster import manager as ws_manager
+from backend.services.event_checkpoint import get_checkpoint, set_checkpoint
+from backend.services.ipfs_uploader import close_ipfs_client
+from backend.services.incident_db import incident_flush_loop, flush_pending_incidents
 import config
 
 logger = config.get_logger("api_server")
 
 # --- Background Task for WebSocket Event Listener ---
+RESPONSE_ENGINE_CHECKPOINT = "response_engine"
+
+async def _broadcast_contract_event(event_type, event):
+    logger.info(f"Caught {event_type} event: {event.args}")
+    await ws_manager.broadcast_json({"event_type": event_type, "data": dict(event.args)})
+
+async def _backfill_missed_events(from_block, to_block):
+    """
+    Replays AdminAlert/IPQuarantined events emitted while the listener was down, in chain order.
+    Fetched in windows the node will accept, advancing the checkpoint after each one.
+    """
+    total = 0
+    for chunk_start in range(from_block, to_block + 1, incidents.INCIDENT_LOG_CHUNK_BLOCKS):
+        chunk_end = min(chunk_start + incidents.INCIDENT_LOG_CHUNK_BLOCKS - 1, to_block)
+        alerts = [("AdminAlert", e) for e in response_contract_instance.events.AdminAlert.get_logs(fromBlock=chunk_start, toBlock=chunk_end)]
+        quarantines = [("IPQuarantined", e) for e in response_contract_instance.events.IPQuarantined.get_logs(fromBlock=chunk_start, toBlock=chunk_end)]
+        # Each get_logs result is already in chain order, so a linear merge replaces a full sort.
+        for event_type, event in heapq.merge(alerts, quarantines, key=lambda m: (m[1].blockNumber, m[1].logIndex)):
+            await _broadcast_contract_event(event_type, event)
+        total += len(alerts) + len(quarantines)
+        set_checkpoint(RESPONSE_ENGINE_CHECKPOINT, chunk_end) # A failure in a later window resumes from here
+    logger.info(f"Backfilled {total} event(s) from blocks {from_block}-{to_block}.")
+
 async def event_listener_background_task():
     logger.info("Starting background event listener for blockchain events.")
-    import json
 
     while True:
         try:
@@ -28,19 +54,39 @@ async def event_listener_background_task():
                 await asyncio.sleep(15)
                 continue
 
+            # Filters first, then the head: every block after head_block is then guaranteed to reach a filter.
             event_filter_admin = response_contract_instance.events.AdminAlert.create_filter(fromBlock='latest')
             event_filter_quarantine = response_contract_instance.events.IPQuarantined.create_filter(fromBlock='latest')
+            head_block = response_contract_instance.w3.eth.block_number
+
+            # Resume from the persisted checkpoint so events emitted during downtime aren't lost.
+            last_processed_block = get_checkpoint(RESPONSE_ENGINE_CHECKPOINT)
+            if last_processed_block is not None and last_processed_block < head_block:
+                await _backfill_missed_events(last_processed_block + 1, head_block)
+            set_checkpoint(RESPONSE_ENGINE_CHECKPOINT, head_block)
+            # Blocks up to here were backfilled or processed before; without a checkpoint nothing was.
+            seen_through = head_block if last_processed_block is not None else -1
 
             logger.info("Background listener started, waiting for AdminAlert and IPQuarantined events...")
 
+            checkpoint_block = head_block
             while True:
+                # Read before polling: every event up to here is in this poll's entries or was already seen
+                polled_head = response_contract_instance.w3.eth.block_number
                 for event in event_filter_admin.get_new_entries():
-                    logger.info(f"Caught AdminAlert event: {event.args}")
-                    await ws_manager.broadcast(json.dumps({"event_type": "AdminAlert", "data": dict(event.args)}))
+                    if event.blockNumber <= seen_through:
+                        continue # Already covered by the backfill
+                    await _broadcast_contract_event("AdminAlert", event)
 
                 for event in event_filter_quarantine.get_new_entries():
-                    logger.info(f"Caught IPQuarantined event: {event.args}")
-                    await ws_manager.broadcast(json.dumps({"event_type": "IPQuarantined", "data": dict(event.args)}))
+                    if event.blockNumber <= seen_through:
+                        continue
+                    await _broadcast_contract_event("IPQuarantined", event)
+
+                # Advanced through quiet periods too, so a restart doesn't backfill from the last event
+                if polled_head > checkpoint_block:
+                    set_checkpoint(RESPONSE_ENGINE_CHECKPOINT, polled_head)
+                    checkpoint_block = polled_head
 
                 await asyncio.sleep(2)
 
@@ -72,6 +118,17 @@ async def startup_event():
     get_pipeline() # Initialize AI pipeline singleton
     # Start background task for event listening
     asyncio.create_task(event_listener_background_task())
+    # Batches local incident DB inserts
+    asyncio.create_task(incident_flush_loop())
+    # Coalesces WebSocket broadcasts into one frame per batch
+    asyncio.create_task(ws_manager.flush_loop())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    logger.info("FastAPI server shutting down...")
+    flush_pending_incidents()
+    await ws_manager.flush()
+    close_ipfs_client()
 
 # --- Include Routers ---
 app.include_router(traffic.router, tags=["Traffic Analysis"])
@@ -1,15 +1,35 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
+import asyncio
+import heapq
+import itertools
+import os
+from collections import defaultdict
+from web3 import Web3
 
 # Import service functions
-from backend.services.blockchain_logger import contract_instance as logger_contract
-from backend.services.blockchain_response_engine import response_contract_instance, get_quarantine_status
-from backend.services.incident_db import get_incidents_by_ip
+from backend.services.blockchain_logger import contract_instance as logger_contract, async_contract_instance as async_logger_contract, web3_instance as logger_web3
+from backend.services.blockchain_response_engine import response_contract_instance, get_quarantine_status_async
+from backend.services.incident_db import get_incidents_by_ip, get_incidents_version
 from backend.services.dao_interactor import get_dao_proposal_details # Example for future use
 
 router = APIRouter()
 
+# Chain-backed reads only change when a new block lands, so clients may reuse them briefly.
+CHAIN_READ_CACHE_CONTROL = "public, max-age=15"
+
+# IncidentLogged events seen so far, in chain order (block, logIndex). Only blocks past
+# _last_block_scanned are fetched on each request, in windows the node will accept.
+INCIDENT_LOG_CHUNK_BLOCKS = int(os.getenv("ZERO_HACK_INCIDENT_LOG_CHUNK_BLOCKS", "5000"))
+_incident_cache: List[Dict[str, Any]] = []
+_last_block_scanned = -1
+# Secondary indexes over the same dicts, each list in chain order: keccak(sourceIP) -> incidents,
+# lowercased attackType -> incidents. Filtered reads walk only the matching entries.
+_by_ip: Dict[bytes, List[Dict[str, Any]]] = defaultdict(list)
+_by_type_lower: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+_incident_cache_lock = asyncio.Lock()
+
 # --- Pydantic Models for this router ---
 class IncidentResponse(BaseModel):
     txHash: str
@@ -28,41 +48,113 @@ class VerdictResponse(BaseModel):
     recent_incidents: List[Dict[str, Any]] = []
 
 
-@router.get("/api/incidents", response_model=List[IncidentResponse], summary="Fetch Logged Cybersecurity Incidents")
-async def get_incidents_api(ip: Optional[str] = Query(None), type: Optional[str] = Query(None), limit: int = Query(100, ge=1)):
-    if not logger_contract:
-        raise HTTPException(status_code=503, detail="Logger contract service unavailable.")
+def _chain_etag(*parts) -> Optional[str]:
+    """Weak ETag tied to the current block number; None if the node can't be reached."""
     try:
-        event_filter = logger_contract.events.IncidentLogged.create_filter(fromBlock='earliest')
-        log_entries = event_filter.get_all_entries()
-        incidents = []
-        for entry in log_entries:
+        block_number = logger_web3.eth.block_number
+    except Exception:
+        return None
+    return 'W/"' + "-".join(str(p) for p in (block_number, *parts)) + '"'
+
+
+def _not_modified(request: Request, response: Response, etag: Optional[str]) -> Optional[Response]:
+    """Sets caching headers and returns a 304 response if the client already has this version."""
+    if not etag:
+        return None
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CHAIN_READ_CACHE_CONTROL
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CHAIN_READ_CACHE_CONTROL})
+    return None
+
+
+def _decode_source_ip(raw_source_ip, queried_ip: Optional[str]) -> str:
+    """Indexed string args come back as their keccak topic, not the original text."""
+    if isinstance(raw_source_ip, str):
+        return raw_source_ip
+    # Entries are matched against the queried IP's topic before this is called.
+    return queried_ip if queried_ip else raw_source_ip.hex()
+
+
+def _ip_key(source_ip) -> bytes:
+    """Index key for a sourceIP: its keccak topic, whether we hold the text or the topic."""
+    return bytes(Web3.keccak(text=source_ip)) if isinstance(source_ip, str) else bytes(source_ip)
+
+
+def _scan_new_incidents() -> None:
+    """Appends IncidentLogged events from blocks after _last_block_scanned to the cache."""
+    global _last_block_scanned
+    head_block = logger_web3.eth.block_number
+    from_block = _last_block_scanned + 1
+    while from_block <= head_block:
+        to_block = min(from_block + INCIDENT_LOG_CHUNK_BLOCKS - 1, head_block)
+        # get_logs returns entries in (blockNumber, logIndex) order, so appending keeps the cache sorted.
+        for entry in logger_contract.events.IncidentLogged.get_logs(fromBlock=from_block, toBlock=to_block):
             args = entry.args
-            incidents.append({
+            incident = {
                 "txHash": entry.transactionHash.hex(), "blockNumber": entry.blockNumber,
                 "sourceIP": args.sourceIP, "timestamp": args.timestamp, "attackType": args.attackType,
                 "explanation": args.explanation, "ipfsHash": args.ipfsHash or None,
-                "reputationScore": args.reputationScore
-            })
+                "reputationScore": args.reputationScore,
+                "_attack_low": args.attackType.lower(),
+                "_seq": len(_incident_cache)
+            }
+            _incident_cache.append(incident)
+            _by_ip[_ip_key(args.sourceIP)].append(incident)
+            _by_type_lower[incident["_attack_low"]].append(incident)
+        _last_block_scanned = to_block # Advanced per chunk so a failure mid-scan resumes from here
+        from_block = to_block + 1
+
 
-        if ip: incidents = [i for i in incidents if i["sourceIP"] == ip]
-        if type: incidents = [i for i in incidents if type.lower() in i["attackType"].lower()]
+@router.get("/api/incidents", response_model=List[IncidentResponse], summary="Fetch Logged Cybersecurity Incidents")
+async def get_incidents_api(request: Request, response: Response, ip: Optional[str] = Query(None), type: Optional[str] = Query(None), limit: int = Query(100, ge=1)):
+    if not logger_contract:
+        raise HTTPException(status_code=503, detail="Logger contract service unavailable.")
+    not_modified = _not_modified(request, response, _chain_etag(ip, type, limit))
+    if not_modified:
+        return not_modified
+    try:
+        async with _incident_cache_lock:
+            await asyncio.to_thread(_scan_new_incidents)
 
-        incidents.sort(key=lambda x: x["blockNumber"], reverse=True)
-        return incidents[:limit]
+        # sourceIP is `indexed` in ZeroHackLogger, so the cache holds keccak(ip) rather than
+        # the text; lookups go through the topic. `type` keeps its substring semantics by
+        # merging every indexed attack type that contains it.
+        type_low = type.lower() if type else None
+        if ip:
+            candidates = reversed(_by_ip.get(_ip_key(ip), []))
+            if type_low:
+                candidates = (i for i in candidates if type_low in i["_attack_low"])
+        elif type_low:
+            matching = [_by_type_lower[t] for t in list(_by_type_lower) if type_low in t]
+            candidates = heapq.merge(*(reversed(m) for m in matching), key=lambda i: -i["_seq"])
+        else:
+            candidates = reversed(_incident_cache)
+        # Newest first, stop once `limit` is reached
+        incidents = [{**i, "sourceIP": _decode_source_ip(i["sourceIP"], ip)} for i in itertools.islice(candidates, limit)]
+        return incidents
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch incidents: {str(e)}")
 
 
 @router.get("/api/verdict/{ip_address}", response_model=VerdictResponse, summary="Get a Comprehensive Verdict for an IP")
-async def get_verdict_for_ip(ip_address: str):
+async def get_verdict_for_ip(ip_address: str, request: Request, response: Response):
     if not response_contract_instance or not logger_contract:
         raise HTTPException(status_code=503, detail="A required blockchain service is unavailable.")
+    # Checked before any contract call so a revalidation costs a block_number RPC and one local
+    # DB read. recent_incidents comes from SQLite, which changes without new blocks, so its version is part of the tag.
+    incidents_version = await asyncio.to_thread(get_incidents_version)
+    not_modified = _not_modified(request, response, _chain_etag(ip_address, incidents_version))
+    if not_modified:
+        return not_modified
 
     try:
-        quarantine_status = get_quarantine_status(ip_address)
-        reputation_score = logger_contract.functions.getReputation(str(ip_address)).call()
-        recent_incidents_for_ip = get_incidents_by_ip(ip_address, limit=5)
+        # The three lookups are independent, so their network/disk latency overlaps.
+        quarantine_status, reputation_score, recent_incidents_for_ip = await asyncio.gather(
+            get_quarantine_status_async(ip_address),
+            async_logger_contract.functions.getReputation(str(ip_address)).call(),
+            asyncio.to_thread(get_incidents_by_ip, ip_address, limit=5),
+        )
 
         return {
             "ip_address": ip_address,
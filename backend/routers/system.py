@@ -1,17 +1,23 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
 from typing import Optional
+import time
 
 # Import service-level status checkers
 from backend.services.blockchain_logger import is_connected_and_configured as is_logger_connected
 from backend.services.blockchain_response_engine import is_connected_and_configured as is_response_engine_connected
-from backend.services.dao_interactor import dao_is_connected_and_configured as is_dao_connected
+from backend.services import dao_interactor # Module reference: the DAO connects lazily, so read the flag live
 from backend.services.ws_broadcaster import manager as ws_manager
+from backend.services.incident_db import get_pool_stats
 # We need a way to check IPFS connection status, can add a function to ipfs_uploader.py
 # from backend.services.ipfs_uploader import check_ipfs_connection
 
 router = APIRouter()
 
+# Monitoring polls this endpoint often; the composed status is reused for a short window.
+STATUS_CACHE_TTL_SECONDS = 1.0
+_status_cache = {"value": None, "ts": 0.0}
+
 class SystemStatusResponse(BaseModel):
     status: str
     logger_contract_connection: str
@@ -26,12 +32,25 @@ async def get_system_status():
     Provides a health check of the ZeroHack backend services, including
     blockchain connections and active WebSocket clients.
     """
+    now = time.monotonic()
+    if _status_cache["value"] is not None and now - _status_cache["ts"] < STATUS_CACHE_TTL_SECONDS:
+        return _status_cache["value"]
+
     # ipfs_status = "connected" if check_ipfs_connection() else "disconnected" # Example
-    return {
+    status = {
         "status": "ok",
         "logger_contract_connection": "connected" if is_logger_connected() else "disconnected",
         "response_engine_connection": "connected" if is_response_engine_connected() else "disconnected",
-        "dao_connection": "connected" if is_dao_connected() else "disconnected",
-        "active_ws_clients": len(ws_manager.active_connections),
+        "dao_connection": "connected" if dao_interactor.dao_is_connected_and_configured else "disconnected",
+        "active_ws_clients": ws_manager.count,
         # "ipfs_connection": ipfs_status
     }
+    _status_cache["value"] = status
+    _status_cache["ts"] = now
+    return status
+
+
+@router.get("/api/pool-health", summary="Local Incident DB Connection Pool Stats")
+async def get_pool_health():
+    """Pool size, connections currently free, and total acquisitions since startup."""
+    return get_pool_stats()
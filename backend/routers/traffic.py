@@ -1,7 +1,13 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Body
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ConfigDict
 from typing import List, Dict, Any, Optional
+from typing_extensions import TypedDict, NotRequired # pydantic needs typing_extensions' TypedDict before Python 3.12
 import pandas as pd
+try:
+    import pyarrow as pa # Optional: builds the typed columns in C++ before handing pandas the frame
+except ImportError:
+    pa = None
 
 # Import the pipeline instance getter from the main app file
 # This avoids circular dependencies if routers need access to app-level state/singletons
@@ -10,22 +16,47 @@ from backend.api_server import get_pipeline, logger
 router = APIRouter()
 
 # --- Pydantic Models for this router ---
-class TrafficEvent(BaseModel):
+class TrafficEvent(TypedDict):
+    """
+    One traffic event. A TypedDict so bulk validation yields plain dicts straight from
+    pydantic-core, with no model instance per event; unset optional fields stay absent.
+    """
+    __pydantic_config__ = ConfigDict(extra='allow') # Extra CSV feature columns pass through to the models
     timestamp: Any
     source_ip: str
     dest_ip: str
     dest_port: int
-    protocol: Optional[str] = None
-    flags: Optional[str] = None
-    SomeFeature1: Optional[float] = None
-    SomeFeature2: Optional[float] = None
-    SomeFeature3: Optional[float] = None
-    Label: Optional[str] = None
-    class Config:
-        extra = 'allow'
+    protocol: NotRequired[Optional[str]]
+    flags: NotRequired[Optional[str]]
+    SomeFeature1: NotRequired[Optional[float]]
+    SomeFeature2: NotRequired[Optional[float]]
+    SomeFeature3: NotRequired[Optional[float]]
+    Label: NotRequired[Optional[str]]
 
-class AnalyzeRequest(BaseModel):
-    events: List[TrafficEvent]
+# Arrow types for the declared fields; timestamp and extra fields are inferred. Strings stay plain
+# (not dictionary-encoded) so the pipeline still sees object columns rather than categoricals.
+_ARROW_TYPES = {
+    "source_ip": pa.string(), "dest_ip": pa.string(), "dest_port": pa.int64(),
+    "protocol": pa.string(), "flags": pa.string(), "Label": pa.string(),
+    "SomeFeature1": pa.float64(), "SomeFeature2": pa.float64(), "SomeFeature3": pa.float64(),
+} if pa else {}
+
+def _events_to_frame(events: List[TrafficEvent]) -> pd.DataFrame:
+    """
+    Builds the DataFrame column by column. Only keys present on at least one event become
+    columns (an all-empty column would make the pipeline's dropna() discard every row).
+    """
+    columns: Dict[str, None] = {} # Ordered set
+    for event in events:
+        columns.update(dict.fromkeys(event))
+    data = {col: [event.get(col) for event in events] for col in columns}
+    if pa:
+        try:
+            table = pa.table({col: pa.array(values, type=_ARROW_TYPES.get(col)) for col, values in data.items()})
+            return table.to_pandas(self_destruct=True, split_blocks=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            pass # Mixed-type extra fields Arrow can't infer; pandas falls back to object columns
+    return pd.DataFrame(data)
 
 class AnalyzeResponse(BaseModel):
     final_verdict: str
@@ -39,13 +70,14 @@ class AnalyzeResponse(BaseModel):
 @router.post("/api/analyze",
              response_model=AnalyzeResponse,
              summary="Analyze Traffic Session for Threats")
-async def analyze_traffic_api(request_data: AnalyzeRequest):
-    if not request_data.events:
+async def analyze_traffic_api(events: List[TrafficEvent] = Body(..., embed=True)):
+    # Body is {"events": [...]}; FastAPI validates the whole list in one pydantic-core call, and
+    # errors keep their ("body", "events", i, field) locations.
+    if not events:
         raise HTTPException(status_code=400, detail="No events provided in the request.")
 
     try:
-        events_dict_list = [event.model_dump(exclude_unset=True) for event in request_data.events]
-        traffic_df = pd.DataFrame(events_dict_list)
+        traffic_df = _events_to_frame(events)
         if 'timestamp' in traffic_df.columns:
             traffic_df['timestamp'] = pd.to_datetime(traffic_df['timestamp'], errors='coerce')
     except Exception as e:
@@ -57,7 +89,8 @@ async def analyze_traffic_api(request_data: AnalyzeRequest):
 
     pipeline = get_pipeline()
     try:
-        analysis_result = pipeline.analyze_traffic_session(traffic_df)
+        # Model inference is CPU-bound; keep it off the event loop so other requests and WS broadcasts still run
+        analysis_result = await run_in_threadpool(pipeline.analyze_traffic_session, traffic_df)
         return analysis_result
     except Exception as e:
         logger.error(f"Error during traffic analysis pipeline: {e}", exc_info=True)
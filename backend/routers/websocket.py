@@ -11,12 +11,15 @@ async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
     try:
         while True:
-            # The client can send data, but for now, we just keep the connection open
-            # to receive broadcasts from the server.
-            await websocket.receive_text()
+            # Clients only listen for broadcasts. Raw receive() skips receive_text()'s decoding;
+            # anything a client sends is ignored and we only wait for the disconnect message.
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                logger.info(f"Client {websocket.client} disconnected from WebSocket.")
+                break
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
         logger.info(f"Client {websocket.client} disconnected from WebSocket.")
     except Exception as e:
         logger.error(f"An error occurred in the WebSocket connection for {websocket.client}: {e}")
+    finally:
         manager.disconnect(websocket)
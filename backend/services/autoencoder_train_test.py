@@ -117,9 +117,17 @@ def train_autoencoder(X_train_scaled, model_save_path, encoder_save_path, epochs
 
     return autoencoder_model, encoder_model, history
 
+def reconstruct(model, X, batch_size=256):
+    """
+    Calls the model directly in batches: model.predict() builds callbacks and a progress bar on
+    every call, which dominates the small batches the detector sees.
+    """
+    return np.concatenate([model(tf.constant(X[start:start + batch_size], dtype=tf.float32), training=False).numpy()
+                           for start in range(0, len(X), batch_size)])
+
 def evaluate_autoencoder_mse(model, X_test_scaled):
     logger.info("Evaluating Autoencoder model (calculating MSE)...")
-    reconstructions = model.predict(X_test_scaled)
+    reconstructions = reconstruct(model, X_test_scaled)
     mse = np.mean(np.square(X_test_scaled - reconstructions), axis=1)
     logger.info(f"Autoencoder MSE mean on test data: {np.mean(mse):.6f}")
     return mse
@@ -295,7 +303,7 @@ class AutoencoderDetector:
             return {"verdict": "error", "score": 0.0, "explanation": f"Error scaling input data: {e}", "model_type": "Autoencoder"}
 
         try:
-            reconstructions = self.model.predict(X_scaled)
+            reconstructions = reconstruct(self.model, X_scaled)
             mse_per_sample = np.mean(np.square(X_scaled - reconstructions), axis=1)
             avg_mse = np.mean(mse_per_sample) # Average MSE for the batch
 
@@ -2,7 +2,12 @@
 
 import os
 import json
-from web3 import Web3
+from web3 import Web3, AsyncWeb3
+
+try:
+    import orjson # Faster JSON (de)serialization; optional, falls back to json
+except ImportError:
+    orjson = None
 # Ensure python-dotenv is in requirements.txt if not already
 # For now, assuming it's installed if .env is to be used.
 # If running in an environment where .env isn't standard, direct env var setting is needed.
@@ -13,6 +18,7 @@ try:
 except ImportError:
     print("python-dotenv not found, ensure environment variables are set manually if .env is not used.")
 
+from backend.services.rpc_session import get_http_provider, get_async_http_provider
 import config # For logger, and potentially for centralizing env var names
 
 logger = config.get_logger(__name__)
@@ -31,10 +37,11 @@ ABI_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "blockc
 
 web3_instance = None
 contract_instance = None
+async_contract_instance = None # AsyncWeb3 contract for view calls from async handlers
 is_connected_and_configured = False
 
 def connect_and_load_contract():
-    global web3_instance, contract_instance, is_connected_and_configured
+    global web3_instance, contract_instance, async_contract_instance, is_connected_and_configured
 
     if not BLOCKCHAIN_RPC_URL:
         logger.error("BLOCKCHAIN_RPC_URL not set in environment.")
@@ -50,16 +57,16 @@ def connect_and_load_contract():
         return False
 
     try:
-        with open(ABI_FILE_PATH, 'r') as f:
-            contract_abi = json.load(f)
+        with open(ABI_FILE_PATH, 'rb') as f:
+            contract_abi = orjson.loads(f.read()) if orjson else json.load(f)
     except FileNotFoundError:
         logger.error(f"Contract ABI file not found at: {ABI_FILE_PATH}")
         return False
-    except json.JSONDecodeError:
+    except json.JSONDecodeError: # orjson.JSONDecodeError subclasses this
         logger.error(f"Error decoding Contract ABI JSON from: {ABI_FILE_PATH}")
         return False
 
-    web3_instance = Web3(Web3.HTTPProvider(BLOCKCHAIN_RPC_URL))
+    web3_instance = Web3(get_http_provider(BLOCKCHAIN_RPC_URL))
 
     # Updated check for web3.py v6+
     if not web3_instance.is_connected():
@@ -77,6 +84,7 @@ def connect_and_load_contract():
     os.environ['ZERO_HACK_SENDER_ACCOUNT_ADDRESS'] = sender_account_checksum # Ensure env var is checksummed if used elsewhere directly
 
     contract_instance = web3_instance.eth.contract(address=checksum_contract_address, abi=contract_abi)
+    async_contract_instance = AsyncWeb3(get_async_http_provider(BLOCKCHAIN_RPC_URL)).eth.contract(address=checksum_contract_address, abi=contract_abi)
     is_connected_and_configured = True
     logger.info(f"ZeroHackLogger contract loaded at address: {checksum_contract_address}")
     return True
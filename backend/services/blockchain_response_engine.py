@@ -1,15 +1,21 @@
 import os
 import json
-from web3 import Web3
+from web3 import Web3, AsyncWeb3
 from web3.middleware import geth_poa_middleware # For PoA chains like Ganache, some testnets
 from typing import Optional, Any
 
+try:
+    import orjson # Faster JSON (de)serialization; optional, falls back to json
+except ImportError:
+    orjson = None
+
 try:
     from dotenv import load_dotenv
     load_dotenv()
 except ImportError:
     pass
 
+from backend.services.rpc_session import get_http_provider, get_async_http_provider
 import config
 
 logger = config.get_logger(__name__)
@@ -25,6 +31,7 @@ RESPONSE_ABI_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__))
 # --- Global Instances ---
 response_web3_instance: Optional[Web3] = None
 response_contract_instance: Optional[Any] = None
+response_async_contract_instance: Optional[Any] = None # AsyncWeb3 contract for view calls from async handlers
 response_is_connected = False
 
 def _get_web3_instance() -> Optional[Web3]:
@@ -37,7 +44,7 @@ def _get_web3_instance() -> Optional[Web3]:
         logger.error("Response Engine: BLOCKCHAIN_RPC_URL not set.")
         return None
 
-    instance = Web3(Web3.HTTPProvider(RESPONSE_RPC_URL))
+    instance = Web3(get_http_provider(RESPONSE_RPC_URL))
     # Add middleware for PoA chains like Ganache, which might be needed
     instance.middleware_onion.inject(geth_poa_middleware, layer=0)
 
@@ -51,7 +58,7 @@ def _get_web3_instance() -> Optional[Web3]:
 
 def _get_contract_instance() -> Optional[Any]:
     """Loads the smart contract instance."""
-    global response_contract_instance
+    global response_contract_instance, response_async_contract_instance
     if response_contract_instance:
         return response_contract_instance
 
@@ -63,8 +70,8 @@ def _get_contract_instance() -> Optional[Any]:
         return None
 
     try:
-        with open(RESPONSE_ABI_FILE_PATH, 'r') as f:
-            abi = json.load(f)
+        with open(RESPONSE_ABI_FILE_PATH, 'rb') as f:
+            abi = orjson.loads(f.read()) if orjson else json.load(f)
     except Exception as e:
         logger.error(f"Response Engine: Failed to load ABI from {RESPONSE_ABI_FILE_PATH}: {e}")
         return None
@@ -72,6 +79,7 @@ def _get_contract_instance() -> Optional[Any]:
     try:
         checksum_address = w3.to_checksum_address(RESPONSE_CONTRACT_ADDRESS_STR)
         response_contract_instance = w3.eth.contract(address=checksum_address, abi=abi)
+        response_async_contract_instance = AsyncWeb3(get_async_http_provider(RESPONSE_RPC_URL)).eth.contract(address=checksum_address, abi=abi)
         logger.info(f"Response Engine: Contract instance loaded at {checksum_address}")
         return response_contract_instance
     except Exception as e:
@@ -145,6 +153,22 @@ def get_quarantine_status(ip: str) -> Optional[bool]:
         logger.error(f"Response Engine: Failed to get quarantine status for IP {ip}: {e}", exc_info=True)
         return None
 
+async def get_quarantine_status_async(ip: str) -> Optional[bool]:
+    """Async counterpart of get_quarantine_status, safe to await from request handlers."""
+    if not response_async_contract_instance:
+        _get_contract_instance()
+    if not response_async_contract_instance:
+        logger.error("Response Engine: get_quarantine_status_async called but contract not initialized.")
+        return None
+
+    try:
+        status = await response_async_contract_instance.functions.getQuarantineStatus(ip).call()
+        logger.info(f"Response Engine: Quarantine status for IP {ip} is {status}")
+        return status
+    except Exception as e:
+        logger.error(f"Response Engine: Failed to get quarantine status for IP {ip}: {e}", exc_info=True)
+        return None
+
 
 if __name__ == '__main__':
     logger.info("Testing Blockchain Response Engine module...")
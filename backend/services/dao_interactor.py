@@ -1,7 +1,18 @@
 import os
 import json
-from web3 import Web3
-from typing import List, Dict, Any, Optional
+import time
+import functools
+import threading
+import logging
+import requests
+from web3 import Web3, AsyncWeb3
+from web3.exceptions import ContractLogicError, BadFunctionCallOutput
+from typing import List, Dict, Any, Optional, Tuple
+
+try:
+    import orjson # Faster JSON (de)serialization; optional, falls back to json
+except ImportError:
+    orjson = None
 
 try:
     from dotenv import load_dotenv
@@ -9,6 +20,7 @@ try:
 except ImportError:
     pass # python-dotenv is optional, env vars can be set manually
 
+from backend.services.rpc_session import get_http_provider, get_async_http_provider
 import config # For logger
 
 logger = config.get_logger(__name__)
@@ -23,16 +35,82 @@ DAO_SENDER_ACCOUNT_ADDRESS = os.getenv("ZERO_HACK_DAO_SENDER_ACCOUNT_ADDRESS", o
 
 DAO_ABI_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "blockchain", "ZeroHackDAOABI.json")
 
+# Multicall3 is deployed at the same address on most chains. Local dev chains (Ganache/Hardhat)
+# usually don't have it, in which case reads fall back to JSON-RPC batching.
+MULTICALL3_ADDRESS = os.getenv("ZERO_HACK_MULTICALL3_ADDRESS", "0xcA11bde05977b3631167028862bE2a173976CA11")
+MULTICALL3_ABI = [{
+    "inputs": [{"components": [{"internalType": "address", "name": "target", "type": "address"},
+                               {"internalType": "bytes", "name": "callData", "type": "bytes"}],
+                "internalType": "struct Multicall3.Call[]", "name": "calls", "type": "tuple[]"}],
+    "name": "aggregate",
+    "outputs": [{"internalType": "uint256", "name": "blockNumber", "type": "uint256"},
+                {"internalType": "bytes[]", "name": "returnData", "type": "bytes[]"}],
+    "stateMutability": "payable", "type": "function"
+}]
+
+# Reverts, undecodable results and an unreachable node are routine here; they're logged
+# as one-line warnings, and tracebacks are kept for unexpected errors at DEBUG level.
+_EXPECTED_CALL_ERRORS = (ContractLogicError, BadFunctionCallOutput, ConnectionError, requests.exceptions.RequestException)
+
 # --- Web3 Connection and Contract Instance ---
 dao_web3_instance: Optional[Web3] = None
 dao_contract_instance: Optional[Any] = None # Web3.eth.Contract
+async_dao_contract_instance: Optional[Any] = None # AsyncWeb3.eth.Contract, for use inside async request handlers
 dao_is_connected_and_configured = False
+dao_nonce_manager: Optional["NonceManager"] = None
+
+# --- Proposal Cache ---
+# Executed proposals are frozen on-chain, so they're cached for the life of the process.
+# In-progress proposals only change via yesVotes/noVotes/executed; they're reused for a short TTL.
+PROPOSAL_CACHE_TTL_SECONDS = 5.0
+_executed_proposals: Dict[int, Dict[str, Any]] = {}
+_open_proposals: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+
+@functools.lru_cache(maxsize=8)
+def _load_abi(path: str, mtime: float) -> list:
+    """Parses an ABI file once per (path, mtime); an edited file is picked up on the next connect."""
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read()) if orjson else json.load(f)
+
+# Checksumming keccak-hashes the address; the same handful of addresses (contract, sender, voters) recur.
+_to_checksum_address = functools.lru_cache(maxsize=1024)(Web3.to_checksum_address)
+
+class NonceManager:
+    """
+    Hands out sequential nonces per sender so concurrent DAO transactions don't collide.
+    The on-chain 'pending' count is read once per sender and then incremented locally.
+    """
+    def __init__(self, web3: Web3):
+        self._web3 = web3
+        self._next: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, address: str) -> int:
+        with self._lock:
+            if address not in self._next:
+                self._next[address] = self._web3.eth.get_transaction_count(address, 'pending')
+            nonce = self._next[address]
+            self._next[address] = nonce + 1
+            return nonce
+
+    def reset(self, address: str):
+        """Forgets the local counter; the next reserve() re-reads the pending count from the node."""
+        with self._lock:
+            self._next.pop(address, None)
+
+# Connection is made lazily by the first call that needs the contract, not at import time.
+_init_lock = threading.Lock()
 
 def connect_and_load_dao_contract():
-    global dao_web3_instance, dao_contract_instance, dao_is_connected_and_configured
-
     if dao_is_connected_and_configured: # Already connected
         return True
+    with _init_lock:
+        if dao_is_connected_and_configured: # Another thread connected while we waited
+            return True
+        return _connect_and_load_dao_contract()
+
+def _connect_and_load_dao_contract():
+    global dao_web3_instance, dao_contract_instance, async_dao_contract_instance, dao_is_connected_and_configured, dao_nonce_manager
 
     if not DAO_BLOCKCHAIN_RPC_URL:
         logger.error("DAO Interactor: BLOCKCHAIN_RPC_URL not set.")
@@ -44,63 +122,117 @@ def connect_and_load_dao_contract():
     # We'll check for them specifically in functions that make transactions.
 
     try:
-        with open(DAO_ABI_FILE_PATH, 'r') as f:
-            contract_abi = json.load(f)
+        contract_abi = _load_abi(DAO_ABI_FILE_PATH, os.path.getmtime(DAO_ABI_FILE_PATH))
     except FileNotFoundError:
         logger.error(f"DAO Interactor: Contract ABI file not found at: {DAO_ABI_FILE_PATH}")
         return False
-    except json.JSONDecodeError:
+    except json.JSONDecodeError: # orjson.JSONDecodeError subclasses this
         logger.error(f"DAO Interactor: Error decoding DAO Contract ABI JSON from: {DAO_ABI_FILE_PATH}")
         return False
 
-    dao_web3_instance = Web3(Web3.HTTPProvider(DAO_BLOCKCHAIN_RPC_URL))
+    dao_web3_instance = Web3(get_http_provider(DAO_BLOCKCHAIN_RPC_URL))
 
     if not dao_web3_instance.is_connected():
         logger.error(f"DAO Interactor: Web3 provider not connected at URL: {DAO_BLOCKCHAIN_RPC_URL}")
         return False
-    logger.info(f"DAO Interactor: Successfully connected to Ethereum node at {DAO_BLOCKCHAIN_RPC_URL}. Chain ID: {dao_web3_instance.eth.chain_id}")
+    logger.info(f"DAO Interactor: Successfully connected to Ethereum node at {DAO_BLOCKCHAIN_RPC_URL}. Chain ID: {_cached_chain_id()}")
 
     try:
-        checksum_dao_contract_address = dao_web3_instance.to_checksum_address(DAO_CONTRACT_ADDRESS_STR)
+        checksum_dao_contract_address = _to_checksum_address(DAO_CONTRACT_ADDRESS_STR)
     except Exception as e:
         logger.error(f"DAO Interactor: Error converting DAO contract address to checksum: {e}. Ensure address is valid.")
         return False
 
     dao_contract_instance = dao_web3_instance.eth.contract(address=checksum_dao_contract_address, abi=contract_abi)
+    async_dao_contract_instance = AsyncWeb3(get_async_http_provider(DAO_BLOCKCHAIN_RPC_URL)).eth.contract(
+        address=checksum_dao_contract_address, abi=contract_abi)
+    dao_nonce_manager = NonceManager(dao_web3_instance)
     dao_is_connected_and_configured = True
     logger.info(f"DAO Interactor: ZeroHackDAO contract loaded at address: {checksum_dao_contract_address}")
     return True
 
+# Fees barely move within a couple of seconds; chain_id never changes for a connection.
+GAS_PRICE_CACHE_TTL_SECONDS = 2.0
+_fee_params_cache = {"value": None, "ts": 0.0}
+_chain_id: Optional[int] = None
+
+def _cached_fee_params(ttl: float = GAS_PRICE_CACHE_TTL_SECONDS) -> Dict[str, int]:
+    """
+    Fee fields for a new transaction: EIP-1559 (type 2) when the chain reports a base fee,
+    legacy gasPrice otherwise. maxFeePerGas leaves room for the base fee to double.
+    """
+    now = time.monotonic()
+    if _fee_params_cache["value"] is None or now - _fee_params_cache["ts"] > ttl:
+        base_fee = dao_web3_instance.eth.get_block("pending").get("baseFeePerGas")
+        if base_fee is None: # Pre-London chain
+            fee_params = {'gasPrice': dao_web3_instance.eth.gas_price}
+        else:
+            tip = dao_web3_instance.eth.max_priority_fee
+            fee_params = {'type': 2, 'maxFeePerGas': 2 * base_fee + tip, 'maxPriorityFeePerGas': tip}
+        _fee_params_cache["value"] = fee_params
+        _fee_params_cache["ts"] = now
+    return _fee_params_cache["value"]
+
+def _cached_chain_id() -> int:
+    global _chain_id
+    if _chain_id is None:
+        _chain_id = dao_web3_instance.eth.chain_id
+    return _chain_id
+
+def _resync_nonce(checksum_address: Optional[str]) -> None:
+    """Makes the next reserve() for this sender re-read the pending nonce from the node."""
+    if checksum_address and dao_nonce_manager:
+        dao_nonce_manager.reset(checksum_address)
+
 def _send_dao_transaction(function_call, from_address, private_key):
     """Helper to send a transaction to the DAO contract."""
     if not dao_is_connected_and_configured or not dao_web3_instance or not from_address or not private_key:
         logger.error("DAO Tx Helper: Not configured to send transaction (missing RPC, address, key, or contract instance).")
         return None
 
+    checksum_from_address = None
     try:
-        checksum_from_address = dao_web3_instance.to_checksum_address(from_address)
-        nonce = dao_web3_instance.eth.get_transaction_count(checksum_from_address)
+        checksum_from_address = _to_checksum_address(from_address)
+
+        # ABI-encode the call once; gas estimation and every signing attempt reuse the same calldata.
+        call_data = function_call._encode_transaction_data()
+        call_params = {'from': checksum_from_address, 'to': function_call.address, 'data': call_data}
 
-        gas_estimate = function_call.estimate_gas({'from': checksum_from_address})
+        gas_estimate = dao_web3_instance.eth.estimate_gas(call_params)
         gas_limit = int(gas_estimate * 1.2) # 20% buffer
-        current_gas_price = dao_web3_instance.eth.gas_price
 
-        txn_params = {
-            'chainId': dao_web3_instance.eth.chain_id,
-            'from': checksum_from_address,
-            'nonce': nonce,
+        txn = {
+            **call_params,
+            'value': 0,
+            'chainId': _cached_chain_id(),
             'gas': gas_limit,
-            'gasPrice': current_gas_price
+            **_cached_fee_params()
         }
 
-        txn = function_call.build_transaction(txn_params)
-        signed_txn = dao_web3_instance.eth.account.sign_transaction(txn, private_key=private_key)
-        tx_hash = dao_web3_instance.eth.send_raw_transaction(signed_txn.rawTransaction)
+        for attempt in range(2):
+            # Only the nonce differs between attempts
+            txn['nonce'] = dao_nonce_manager.reserve(checksum_from_address)
+            signed_txn = dao_web3_instance.eth.account.sign_transaction(txn, private_key=private_key)
+            try:
+                tx_hash = dao_web3_instance.eth.send_raw_transaction(signed_txn.rawTransaction)
+                break
+            except ValueError as e:
+                # Out of sync with the node (another process sent from this account, or a tx was dropped)
+                if attempt == 0 and "nonce" in str(e).lower():
+                    logger.warning(f"DAO transaction nonce rejected ({e}); resyncing nonce for {checksum_from_address}.")
+                    _resync_nonce(checksum_from_address)
+                    continue
+                raise
         hex_tx_hash = dao_web3_instance.to_hex(tx_hash)
         logger.info(f"DAO transaction sent. Tx hash: {hex_tx_hash}")
         return hex_tx_hash
+    except _EXPECTED_CALL_ERRORS as e:
+        logger.warning(f"DAO transaction failed: {e}")
+        _resync_nonce(checksum_from_address) # A reserved nonce may not have been used
+        return None
     except Exception as e:
-        logger.error(f"DAO transaction failed: {e}", exc_info=True)
+        logger.error(f"DAO transaction failed: {e}", exc_info=logger.isEnabledFor(logging.DEBUG))
+        _resync_nonce(checksum_from_address) # A reserved nonce may not have been used
         return None
 
 # --- DAO Contract Interaction Functions ---
@@ -125,7 +257,10 @@ def cast_dao_vote(proposal_id: int, support: bool,
         return None
 
     function_call = dao_contract_instance.functions.vote(proposal_id, support)
-    return _send_dao_transaction(function_call, sender_address, sender_private_key)
+    tx_hash = _send_dao_transaction(function_call, sender_address, sender_private_key)
+    if tx_hash:
+        _invalidate_proposal(proposal_id) # Don't serve pre-vote counts after our own vote
+    return tx_hash
 
 def execute_dao_proposal(proposal_id: int,
                          sender_address: str = DAO_SENDER_ACCOUNT_ADDRESS,
@@ -136,26 +271,60 @@ def execute_dao_proposal(proposal_id: int,
         return None
 
     function_call = dao_contract_instance.functions.executeProposal(proposal_id)
-    return _send_dao_transaction(function_call, sender_address, sender_private_key)
+    tx_hash = _send_dao_transaction(function_call, sender_address, sender_private_key)
+    if tx_hash:
+        _invalidate_proposal(proposal_id)
+    return tx_hash
+
+def _proposal_to_dict(proposal_data) -> Dict[str, Any]:
+    # ABI output names: id, ip, reason, yesVotes, noVotes, deadline, executed
+    return {
+        "id": proposal_data[0],
+        "ip": proposal_data[1],
+        "reason": proposal_data[2],
+        "yesVotes": proposal_data[3],
+        "noVotes": proposal_data[4],
+        "deadline": proposal_data[5], # Timestamp
+        "executed": proposal_data[6]
+        # "passed" status is determined off-chain or by an event after execution
+    }
+
+def _get_cached_proposal(proposal_id: int) -> Optional[Dict[str, Any]]:
+    proposal = _executed_proposals.get(proposal_id)
+    if proposal is not None:
+        return dict(proposal)
+    entry = _open_proposals.get(proposal_id)
+    if entry is not None and time.monotonic() - entry[0] < PROPOSAL_CACHE_TTL_SECONDS:
+        return dict(entry[1])
+    return None
+
+def _cache_proposal(proposal: Dict[str, Any]) -> None:
+    if proposal["executed"]:
+        _executed_proposals[proposal["id"]] = proposal
+        _open_proposals.pop(proposal["id"], None)
+    else:
+        _open_proposals[proposal["id"]] = (time.monotonic(), proposal)
+
+def _invalidate_proposal(proposal_id: int) -> None:
+    _open_proposals.pop(proposal_id, None)
+    _executed_proposals.pop(proposal_id, None)
 
 def get_dao_proposal_details(proposal_id: int) -> Optional[Dict[str, Any]]:
+    cached = _get_cached_proposal(proposal_id)
+    if cached is not None:
+        return cached
     if not dao_contract_instance: connect_and_load_dao_contract()
     if not dao_contract_instance: return None
     try:
-        # ABI output names: id, ip, reason, yesVotes, noVotes, deadline, executed
         proposal_data = dao_contract_instance.functions.getProposal(proposal_id).call()
-        return {
-            "id": proposal_data[0],
-            "ip": proposal_data[1],
-            "reason": proposal_data[2],
-            "yesVotes": proposal_data[3],
-            "noVotes": proposal_data[4],
-            "deadline": proposal_data[5], # Timestamp
-            "executed": proposal_data[6]
-            # "passed" status is determined off-chain or by an event after execution
-        }
+        proposal = _proposal_to_dict(proposal_data)
+        _cache_proposal(proposal)
+        return dict(proposal)
+    except _EXPECTED_CALL_ERRORS as e:
+        logger.warning(f"DAO Error fetching proposal {proposal_id}: {e}")
+        return None
     except Exception as e:
-        logger.error(f"DAO Error fetching proposal {proposal_id}: {e}", exc_info=True)
+        logger.error(f"DAO Error fetching proposal {proposal_id}: {e}", exc_info=logger.isEnabledFor(logging.DEBUG))
         return None
 
 def get_dao_proposal_count() -> Optional[int]:
@@ -163,40 +332,163 @@ def get_dao_proposal_count() -> Optional[int]:
     if not dao_contract_instance: return None
     try:
         return dao_contract_instance.functions.proposalCount().call()
+    except _EXPECTED_CALL_ERRORS as e:
+        logger.warning(f"DAO Error fetching proposal count: {e}")
+        return None
     except Exception as e:
-        logger.error(f"DAO Error fetching proposal count: {e}", exc_info=True)
+        logger.error(f"DAO Error fetching proposal count: {e}", exc_info=logger.isEnabledFor(logging.DEBUG))
         return None
 
 def check_is_voter(address: str) -> Optional[bool]:
     if not dao_contract_instance: connect_and_load_dao_contract()
     if not dao_contract_instance: return None
     try:
-        checksum_address = dao_web3_instance.to_checksum_address(address)
+        checksum_address = _to_checksum_address(address)
         return dao_contract_instance.functions.isVoter(checksum_address).call()
+    except _EXPECTED_CALL_ERRORS as e:
+        logger.warning(f"DAO Error checking if {address} is voter: {e}")
+        return None
     except Exception as e:
-        logger.error(f"DAO Error checking if {address} is voter: {e}", exc_info=True)
+        logger.error(f"DAO Error checking if {address} is voter: {e}", exc_info=logger.isEnabledFor(logging.DEBUG))
+        return None
+
+# --- Async variants (for FastAPI handlers; they don't block the event loop) ---
+
+async def get_dao_proposal_details_async(proposal_id: int) -> Optional[Dict[str, Any]]:
+    cached = _get_cached_proposal(proposal_id)
+    if cached is not None:
+        return cached
+    if not async_dao_contract_instance: connect_and_load_dao_contract()
+    if not async_dao_contract_instance: return None
+    try:
+        proposal_data = await async_dao_contract_instance.functions.getProposal(proposal_id).call()
+        proposal = _proposal_to_dict(proposal_data)
+        _cache_proposal(proposal)
+        return dict(proposal)
+    except _EXPECTED_CALL_ERRORS as e:
+        logger.warning(f"DAO Error fetching proposal {proposal_id}: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"DAO Error fetching proposal {proposal_id}: {e}", exc_info=logger.isEnabledFor(logging.DEBUG))
+        return None
+
+async def get_dao_proposal_count_async() -> Optional[int]:
+    if not async_dao_contract_instance: connect_and_load_dao_contract()
+    if not async_dao_contract_instance: return None
+    try:
+        return await async_dao_contract_instance.functions.proposalCount().call()
+    except _EXPECTED_CALL_ERRORS as e:
+        logger.warning(f"DAO Error fetching proposal count: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"DAO Error fetching proposal count: {e}", exc_info=logger.isEnabledFor(logging.DEBUG))
+        return None
+
+async def check_is_voter_async(address: str) -> Optional[bool]:
+    if not async_dao_contract_instance: connect_and_load_dao_contract()
+    if not async_dao_contract_instance: return None
+    try:
+        checksum_address = _to_checksum_address(address)
+        return await async_dao_contract_instance.functions.isVoter(checksum_address).call()
+    except _EXPECTED_CALL_ERRORS as e:
+        logger.warning(f"DAO Error checking if {address} is voter: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"DAO Error checking if {address} is voter: {e}", exc_info=logger.isEnabledFor(logging.DEBUG))
+        return None
+
+# Multicall3 is checked for once per provider; local Hardhat/Ganache nodes don't have it deployed.
+_multicall_cache: Dict[str, Any] = {"web3": None, "contract": None}
+
+def _multicall_contract() -> Optional[Any]:
+    """Multicall3 on the DAO's chain, or None if there is no contract code at MULTICALL3_ADDRESS."""
+    if _multicall_cache["web3"] is not dao_web3_instance:
+        address = _to_checksum_address(MULTICALL3_ADDRESS)
+        has_code = bool(dao_web3_instance.eth.get_code(address))
+        if not has_code:
+            logger.info(f"DAO Interactor: No Multicall3 contract at {address}; proposals are fetched with batched calls.")
+        _multicall_cache["contract"] = dao_web3_instance.eth.contract(address=address, abi=MULTICALL3_ABI) if has_code else None
+        _multicall_cache["web3"] = dao_web3_instance
+    return _multicall_cache["contract"]
+
+def _fetch_proposals_multicall(proposal_ids: List[int]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Fetches the given proposals with one Multicall3.aggregate eth_call, so the node runs a
+    single EVM execution instead of one per proposal. Returns None if Multicall3 isn't usable.
+    """
+    try:
+        multicall = _multicall_contract()
+        if multicall is None:
+            return None
+        calls = [(dao_contract_instance.address, dao_contract_instance.encodeABI(fn_name="getProposal", args=[i]))
+                 for i in proposal_ids]
+        _, return_data = multicall.functions.aggregate(calls).call()
+        output_types = [output["type"] for output in dao_contract_instance.get_function_by_name("getProposal").abi["outputs"]]
+        return [_proposal_to_dict(dao_web3_instance.codec.decode(output_types, data)) for data in return_data]
+    except Exception as e:
+        logger.warning(f"DAO multicall proposal fetch unavailable, falling back to batched calls: {e}")
+        return None
+
+def _fetch_proposals_batched(proposal_ids: List[int]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Fetches the given proposals in a single JSON-RPC batch (one HTTP round-trip).
+    Returns None if this web3.py version has no batch support or the batch fails,
+    so the caller can fall back to sequential calls.
+    """
+    if not hasattr(dao_web3_instance, "batch_requests"): # Added in web3.py 6.14
+        return None
+    try:
+        with dao_web3_instance.batch_requests() as batch:
+            for i in proposal_ids:
+                batch.add(dao_contract_instance.functions.getProposal(i))
+            results = batch.execute()
+        return [_proposal_to_dict(proposal_data) for proposal_data in results]
+    except Exception as e:
+        logger.warning(f"DAO batched proposal fetch failed, falling back to sequential calls: {e}")
         return None
 
 def get_all_dao_proposals() -> List[Dict[str, Any]]:
-    """Fetches details for all proposals by iterating up to proposalCount."""
+    """
+    Fetches details for all proposals up to proposalCount.
+    Cached proposals are reused; the rest are read with one Multicall3 eth_call,
+    then a JSON-RPC batch, then one call per proposal.
+    """
     if not dao_contract_instance: connect_and_load_dao_contract()
     if not dao_contract_instance: return []
 
     count = get_dao_proposal_count()
-    if count is None: return []
+    if not count: return []
 
-    all_proposals = []
+    proposals_by_id = {}
+    missing_ids = []
     for i in range(count):
-        proposal = get_dao_proposal_details(i)
-        if proposal:
-            all_proposals.append(proposal)
-    return all_proposals
+        cached = _get_cached_proposal(i)
+        if cached is not None:
+            proposals_by_id[i] = cached
+        else:
+            missing_ids.append(i)
+
+    if missing_ids:
+        fetched = None
+        for fetch in (_fetch_proposals_multicall, _fetch_proposals_batched):
+            fetched = fetch(missing_ids)
+            if fetched is not None:
+                break
+        if fetched is not None:
+            for i, proposal in zip(missing_ids, fetched):
+                _cache_proposal(proposal)
+                proposals_by_id[i] = dict(proposal)
+        else:
+            for i in missing_ids:
+                proposal = get_dao_proposal_details(i)
+                if proposal:
+                    proposals_by_id[i] = proposal
 
-# Initialize connection on module load
-connect_and_load_dao_contract()
+    return [proposals_by_id[i] for i in range(count) if i in proposals_by_id]
 
 if __name__ == '__main__':
     logger.info("Testing DAO Interactor Module...")
+    connect_and_load_dao_contract()
     if not dao_is_connected_and_configured:
         logger.error("DAO Contract not configured. Set ZERO_HACK_DAO_CONTRACT_ADDRESS and ensure ABI is correct.")
         logger.info(f"Expected DAO ABI path: {os.path.abspath(DAO_ABI_FILE_PATH)}")
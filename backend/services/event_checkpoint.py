@@ -0,0 +1,64 @@
+import sqlite3
+import os
+from contextlib import closing
+from typing import Optional
+
+import config # For logger
+
+logger = config.get_logger(__name__)
+
+# Stored next to the local incident DB.
+# Assuming this script is in backend/, so ../logs/
+DB_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs")
+DB_PATH = os.path.join(DB_DIR, "events.db")
+
+def init_checkpoint_db():
+    """Creates the checkpoint table (one row per event consumer) and switches the DB to WAL."""
+    try:
+        os.makedirs(DB_DIR, exist_ok=True)
+        with closing(sqlite3.connect(DB_PATH)) as conn, conn: # Closes; the inner `conn` commits
+            conn.execute("PRAGMA journal_mode=WAL") # Persists in the DB file, only needs to run once
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS checkpoint (
+                    name TEXT PRIMARY KEY,
+                    block INTEGER NOT NULL
+                )
+            ''')
+        logger.info(f"Event checkpoint database initialized/checked successfully at {DB_PATH}")
+    except sqlite3.Error as e:
+        logger.error(f"SQLite error during checkpoint DB initialization: {e}", exc_info=True)
+
+def get_checkpoint(name: str) -> Optional[int]:
+    """Returns the last fully processed block for `name`, or None if it has never run."""
+    try:
+        with closing(sqlite3.connect(DB_PATH)) as conn:
+            row = conn.execute("SELECT block FROM checkpoint WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+    except sqlite3.Error as e:
+        logger.error(f"SQLite error reading checkpoint '{name}': {e}")
+        return None
+
+def set_checkpoint(name: str, block: int) -> bool:
+    """Records `block` as processed for `name`. Never moves a checkpoint backwards."""
+    try:
+        with closing(sqlite3.connect(DB_PATH)) as conn, conn:
+            conn.execute('''
+                INSERT INTO checkpoint (name, block) VALUES (?, ?)
+                ON CONFLICT(name) DO UPDATE SET block = excluded.block
+                WHERE excluded.block > checkpoint.block
+            ''', (name, int(block)))
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"SQLite error updating checkpoint '{name}' to block {block}: {e}")
+        return False
+
+
+if __name__ == '__main__':
+    logger.info("Testing event_checkpoint.py...")
+    init_checkpoint_db()
+    set_checkpoint("test_consumer", 10)
+    set_checkpoint("test_consumer", 5) # Ignored, older than the stored block
+    logger.info(f"Checkpoint for 'test_consumer': {get_checkpoint('test_consumer')}")
+else:
+    # Ensure the table exists before the listener or API use it
+    init_checkpoint_db()
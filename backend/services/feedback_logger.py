@@ -1,7 +1,12 @@
 import os
 import json
 import datetime
-import uuid # For potentially more unique filenames if needed
+import threading
+
+try:
+    import orjson # Much faster serializer; optional
+except ImportError:
+    orjson = None
 
 import config # For logger
 
@@ -10,18 +15,30 @@ logger = config.get_logger(__name__)
 # Define the directory for storing feedback logs relative to the project root
 # Assuming this script is in backend/, so ../feedback_logs/
 FEEDBACK_LOGS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "feedback_logs")
+os.makedirs(FEEDBACK_LOGS_DIR, exist_ok=True)
+
+# One append-only JSON Lines file per day; the lock keeps concurrent records from interleaving.
+_write_lock = threading.Lock()
+
+def _feedback_log_path(now: datetime.datetime) -> str:
+    return os.path.join(FEEDBACK_LOGS_DIR, f"feedback_{now.strftime('%Y%m%d')}.jsonl")
+
+def _encode_line(feedback_data: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(feedback_data, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(feedback_data, separators=(",", ":")) + "\n").encode("utf-8")
 
 
 def log_incident_feedback(feedback_data: dict):
     """
-    Logs the provided feedback data to a JSON file in the feedback_logs directory.
+    Appends the provided feedback data as one line to today's JSONL file in the feedback_logs directory.
 
     Args:
         feedback_data (dict): A dictionary containing the feedback.
                               Expected to include 'incident_identifier',
                               'original_features', and 'user_feedback'.
     Returns:
-        str: The path to the saved feedback file if successful, else None.
+        str: The path to the feedback file the record was appended to if successful, else None.
     """
     if not isinstance(feedback_data, dict):
         logger.error("Invalid feedback_data: Must be a dictionary.")
@@ -30,21 +47,13 @@ def log_incident_feedback(feedback_data: dict):
     incident_id = feedback_data.get('incident_identifier', 'unknown_incident')
 
     try:
-        # Ensure the feedback_logs directory exists
-        os.makedirs(FEEDBACK_LOGS_DIR, exist_ok=True)
-
-        # Create a unique filename
-        timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-        # Sanitize incident_id for filename, or use a UUID if incident_id can be complex/long
-        safe_incident_id = "".join(c if c.isalnum() else "_" for c in str(incident_id))
-        filename = f"feedback_{safe_incident_id}_{timestamp_str}.json"
-        filepath = os.path.join(FEEDBACK_LOGS_DIR, filename)
-
-        # Write the feedback data to the JSON file
-        with open(filepath, 'w') as f:
-            json.dump(feedback_data, f, indent=2)
+        line = _encode_line(feedback_data)
+        filepath = _feedback_log_path(datetime.datetime.now())
+        with _write_lock:
+            with open(filepath, 'ab') as f:
+                f.write(line)
 
-        logger.info(f"Feedback for incident '{incident_id}' successfully logged to: {filepath}")
+        logger.info(f"Feedback for incident '{incident_id}' successfully appended to: {filepath}")
         return filepath
 
     except Exception as e:
@@ -107,4 +116,4 @@ if __name__ == '__main__':
     if log_invalid is None:
         print("Correctly handled invalid input for feedback logging.")
 
-    print(f"\nCheck the '{os.path.abspath(FEEDBACK_LOGS_DIR)}' directory for generated log files.")
+    print(f"\nCheck the '{os.path.abspath(FEEDBACK_LOGS_DIR)}' directory for the generated feedback_*.jsonl file.")
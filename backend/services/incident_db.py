@@ -2,7 +2,25 @@ import sqlite3
 import os
 import uuid
 import datetime
+import asyncio
 import json # For storing complex data like layer_outputs if needed as TEXT
+import hashlib
+import queue
+import time
+import threading
+import itertools
+from collections import Counter
+from contextlib import contextmanager, closing
+from typing import Optional, List, Dict, Any
+
+try:
+    import orjson # Faster JSON (de)serialization for the detail blobs; optional, falls back to json
+except ImportError:
+    orjson = None
+try:
+    import zstandard # Optional: compresses the per-incident JSON detail blobs
+except ImportError:
+    zstandard = None
 
 import config # For logger
 
@@ -13,40 +31,271 @@ logger = config.get_logger(__name__)
 DB_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs")
 DB_PATH = os.path.join(DB_DIR, "local_incidents.sqlite")
 
+# Per-connection tuning. journal_mode=WAL is persistent and set once in init_db();
+# with WAL, synchronous=NORMAL only fsyncs at checkpoints instead of on every commit.
+_CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL;"
+    "PRAGMA temp_store=MEMORY;"
+    "PRAGMA cache_size=-65536;" # 64 MiB page cache
+    "PRAGMA mmap_size=268435456;" # 256 MiB
+    "PRAGMA wal_autocheckpoint=1000;" # Backstop only; the flush loop checkpoints in the background
+)
+
+def _connect() -> sqlite3.Connection:
+    """Opens a tuned connection in autocommit mode (each statement commits unless wrapped in BEGIN)."""
+    # Pooled connections live for the whole process, so their statement caches stay warm.
+    conn = sqlite3.connect(DB_PATH, isolation_level=None, check_same_thread=False, timeout=30, cached_statements=256)
+    conn.executescript(_CONNECTION_PRAGMAS)
+    return conn
+
+# Detail blobs are JSON, zstd-compressed when zstandard is installed. Compressed blobs are
+# recognised by the zstd frame magic, so either kind can be read back.
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_ZSTD_LEVEL = 3
+_codec_local = threading.local() # zstd (de)compressor objects must not be shared between threads
+
+def _dumps(obj) -> bytes:
+    if orjson:
+        # Layer outputs carry numpy scalars/arrays and can be keyed by non-str ids
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+_loads = orjson.loads if orjson else json.loads # Both accept str and bytes
+
+def _pack_blob(obj) -> Optional[bytes]:
+    if obj is None:
+        return None
+    data = _dumps(obj)
+    if zstandard is None:
+        return data
+    if not hasattr(_codec_local, "compressor"):
+        _codec_local.compressor = zstandard.ZstdCompressor(level=_ZSTD_LEVEL)
+    return _codec_local.compressor.compress(data)
+
+def _unpack_blob(blob: Optional[bytes]):
+    if blob is None:
+        return None
+    if blob[:4] == _ZSTD_MAGIC:
+        if zstandard is None:
+            raise RuntimeError("Incident detail blob is zstd-compressed but the zstandard package is not installed.")
+        if not hasattr(_codec_local, "decompressor"):
+            _codec_local.decompressor = zstandard.ZstdDecompressor()
+        blob = _codec_local.decompressor.decompress(blob)
+    return _loads(blob)
+
+class SqlitePool:
+    """Fixed-size pool of tuned connections; reusing them keeps each connection's page and statement caches warm."""
+    def __init__(self, size: int = 8):
+        self.size = size
+        self.total_acquisitions = 0
+        self._count_lock = threading.Lock() # acquire() runs on to_thread workers and the flush loop at once
+        self._q: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(size):
+            conn = _connect()
+            conn.row_factory = sqlite3.Row # Access columns by name (index access still works)
+            self._q.put(conn)
+
+    @contextmanager
+    def acquire(self):
+        conn = self._q.get()
+        with self._count_lock:
+            self.total_acquisitions += 1
+        try:
+            yield conn
+        finally:
+            self._q.put(conn)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": self.size, "available": self._q.qsize(), "total_acquisitions": self.total_acquisitions}
+
+SQLITE_POOL_SIZE = int(os.getenv("ZERO_HACK_SQLITE_POOL_SIZE", "8"))
+POOL: Optional[SqlitePool] = None
+_pool_lock = threading.Lock()
+
+@contextmanager
+def get_conn():
+    """Borrows a pooled connection for the duration of the `with` block."""
+    global POOL
+    if POOL is None: # init_db() normally creates it; this covers callers that skipped it
+        with _pool_lock:
+            if POOL is None:
+                POOL = SqlitePool(SQLITE_POOL_SIZE)
+    with POOL.acquire() as conn:
+        yield conn
+
+def get_pool_stats() -> Dict[str, int]:
+    return POOL.stats() if POOL else {"size": 0, "available": 0, "total_acquisitions": 0}
+
+def _ip_hash(source_ip: Optional[str]) -> Optional[int]:
+    """
+    Signed 64-bit key for source_ip, so per-IP seeks and grouping compare integers. Always
+    blake2b: the stored values must not depend on which optional hash packages are installed.
+    """
+    if source_ip is None:
+        return None
+    return int.from_bytes(hashlib.blake2b(source_ip.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+_SQL_INSERT = '''
+    INSERT INTO incidents (
+        id, detection_timestamp, source_ip, attack_type, explanation,
+        confidence, ipfs_hash, blockchain_tx_hash, source_ip_hash
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+_SQL_INSERT_DETAILS = "INSERT INTO incident_details (id, layer_outputs, full_threat_data) VALUES (?, ?, ?)"
+
+# Fixed SQL text so each pooled connection prepares a statement once and reuses it.
+# Columns of the main incidents row. The JSON detail blobs live in incident_details so list
+# queries and aggregates don't page them in.
+_ROW_COLS = "i.id, i.detection_timestamp, i.source_ip, i.attack_type, i.explanation, i.confidence, i.ipfs_hash, i.blockchain_tx_hash"
+_SQL_GET_BY_ID = f"""
+    SELECT {_ROW_COLS}, d.layer_outputs, d.full_threat_data,
+           i.layer_outputs_json, i.full_threat_data_json
+    FROM incidents i LEFT JOIN incident_details d ON d.id = i.id
+    WHERE i.id = ?
+"""
+# List views only project what the dashboards show; explanation aside, these are short fields,
+# and the detail blobs are decoded in get_incident_by_id alone.
+_LIST_COLS = "id, detection_timestamp, source_ip, attack_type, confidence, ipfs_hash, explanation"
+_SQL_RECENT = f"SELECT {_LIST_COLS} FROM incidents ORDER BY detection_timestamp DESC LIMIT ?"
+# Seek on the hash; the source_ip comparison only guards against hash collisions
+_SQL_BY_IP = f"""
+    SELECT {_LIST_COLS} FROM incidents
+    WHERE source_ip_hash = ? AND source_ip = ?
+    ORDER BY detection_timestamp DESC
+    LIMIT ?
+"""
+# Analytics read from rollup tables that add_incidents_bulk keeps current in the same
+# transaction as the insert, so dashboard refreshes don't re-aggregate the incidents table.
+_ROLLUP_HOUR_FMT = "%Y-%m-%d %H:00:00"
+_ROLLUP_FILTERS = {
+    "hourly": f"strftime('{_ROLLUP_HOUR_FMT}', detection_timestamp) IS NOT NULL",
+    "attack_type": "attack_type IS NOT NULL AND attack_type != ''",
+    "source_ip": "source_ip IS NOT NULL AND source_ip != '' AND source_ip != 'N/A'",
+}
+_SQL_ROLLUP_HOURLY = f"""
+    INSERT INTO incidents_rollup_hourly (period_start, cnt)
+    SELECT strftime('{_ROLLUP_HOUR_FMT}', ?), 1 WHERE strftime('{_ROLLUP_HOUR_FMT}', ?) IS NOT NULL
+    ON CONFLICT(period_start) DO UPDATE SET cnt = cnt + excluded.cnt
+"""
+_SQL_ROLLUP_ATTACK_TYPE = """
+    INSERT INTO attack_type_counts (attack_type, cnt) VALUES (?, ?)
+    ON CONFLICT(attack_type) DO UPDATE SET cnt = cnt + excluded.cnt
+"""
+_SQL_ROLLUP_SOURCE_IP = """
+    INSERT INTO source_ip_counts (source_ip, cnt) VALUES (?, ?)
+    ON CONFLICT(source_ip) DO UPDATE SET cnt = cnt + excluded.cnt
+"""
+# Coarser periods are re-bucketed from the hourly rollup; the strftime format is a bound
+# parameter, so one plan serves every period. The inner query picks the latest N periods and
+# the outer one returns them oldest-first for charts.
+_SQL_THREATS_OVER_TIME = """
+    SELECT period_start, incident_count FROM (
+        SELECT
+            strftime(?, period_start) as period_start,
+            SUM(cnt) as incident_count
+        FROM incidents_rollup_hourly
+        GROUP BY 1
+        ORDER BY 1 DESC
+        LIMIT ?
+    )
+    ORDER BY period_start ASC
+"""
+_SQL_ATTACK_TYPES = "SELECT attack_type, cnt FROM attack_type_counts ORDER BY cnt DESC"
+_SQL_TOP_IPS = "SELECT source_ip, cnt FROM source_ip_counts ORDER BY cnt DESC LIMIT ?"
+
+# While the API runs, add_incident() only enqueues; incident_flush_loop() writes up to
+# INCIDENT_BATCH_SIZE rows per transaction so the WAL sync is shared across the batch.
+INCIDENT_BATCH_SIZE = 50
+INCIDENT_FLUSH_INTERVAL_SECONDS = 0.2
+WAL_CHECKPOINT_INTERVAL_SECONDS = 30.0
+# A queued batch whose write fails transiently (e.g. "database is locked") is retried before
+# falling back to one row per transaction, so a bad row can't take the rest of the batch with it
+INCIDENT_WRITE_RETRIES = 3
+INCIDENT_WRITE_RETRY_DELAY_SECONDS = 0.5
+_incident_queue: "queue.Queue[tuple]" = queue.Queue()
+_flush_loop_running = False
+# Bumped after every committed write from this process; see get_incidents_version()
+_write_counter = itertools.count(1)
+_write_version = 0
+
 def init_db():
     """Initializes the database and creates the incidents table if it doesn't exist."""
+    global POOL
     try:
         os.makedirs(DB_DIR, exist_ok=True)
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        # Create incidents table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS incidents (
-                id TEXT PRIMARY KEY,
-                detection_timestamp TEXT NOT NULL,
-                source_ip TEXT,
-                attack_type TEXT,
-                explanation TEXT,
-                confidence REAL,
-                ipfs_hash TEXT,
-                blockchain_tx_hash TEXT,
-                layer_outputs_json TEXT,
-                full_threat_data_json TEXT
-            )
-        ''')
-        # Added layer_outputs_json to store the list of dicts from aggregator
-        # Added full_threat_data_json to store the complete threat_data dict from aggregator
-
-        conn.commit()
-        logger.info(f"Database initialized/checked successfully at {DB_PATH}")
+        with closing(_connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL") # Persists in the DB file
+            cursor = conn.cursor()
+
+            # Create incidents table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS incidents (
+                    id TEXT PRIMARY KEY,
+                    detection_timestamp TEXT NOT NULL,
+                    source_ip TEXT,
+                    attack_type TEXT,
+                    explanation TEXT,
+                    confidence REAL,
+                    ipfs_hash TEXT,
+                    blockchain_tx_hash TEXT,
+                    layer_outputs_json TEXT,
+                    full_threat_data_json TEXT,
+                    source_ip_hash INTEGER
+                )
+            ''')
+            # Databases created before source_ip_hash existed: add the column and backfill it once
+            existing_cols = {row[1] for row in cursor.execute("PRAGMA table_info(incidents)")}
+            if "source_ip_hash" not in existing_cols:
+                conn.create_function("ip_hash", 1, _ip_hash, deterministic=True)
+                cursor.execute("ALTER TABLE incidents ADD COLUMN source_ip_hash INTEGER")
+                cursor.execute("UPDATE incidents SET source_ip_hash = ip_hash(source_ip) WHERE source_ip IS NOT NULL")
+            # layer_outputs_json / full_threat_data_json are only read for rows written before
+            # incident_details existed; new rows leave them NULL.
+
+            # Large per-incident payloads: the aggregator's layer_outputs list and the full threat_data dict
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS incident_details (
+                    id TEXT PRIMARY KEY REFERENCES incidents(id),
+                    layer_outputs BLOB,
+                    full_threat_data BLOB
+                )
+            ''')
+
+            # Rollups (see _SQL_ROLLUP_*); filled from existing incidents the first time they are created
+            rollups_exist = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'incidents_rollup_hourly'").fetchone()
+            if not rollups_exist:
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute("CREATE TABLE incidents_rollup_hourly (period_start TEXT PRIMARY KEY, cnt INTEGER NOT NULL)")
+                cursor.execute("CREATE TABLE attack_type_counts (attack_type TEXT PRIMARY KEY, cnt INTEGER NOT NULL)")
+                cursor.execute("CREATE TABLE source_ip_counts (source_ip TEXT PRIMARY KEY, cnt INTEGER NOT NULL)")
+                cursor.execute("CREATE INDEX idx_source_ip_counts_cnt ON source_ip_counts(cnt DESC)")
+                cursor.execute(f"""
+                    INSERT INTO incidents_rollup_hourly (period_start, cnt)
+                    SELECT strftime('{_ROLLUP_HOUR_FMT}', detection_timestamp), COUNT(*) FROM incidents
+                    WHERE {_ROLLUP_FILTERS['hourly']} GROUP BY 1""")
+                cursor.execute(f"""
+                    INSERT INTO attack_type_counts (attack_type, cnt)
+                    SELECT attack_type, COUNT(*) FROM incidents WHERE {_ROLLUP_FILTERS['attack_type']} GROUP BY 1""")
+                cursor.execute(f"""
+                    INSERT INTO source_ip_counts (source_ip, cnt)
+                    SELECT source_ip, COUNT(*) FROM incidents WHERE {_ROLLUP_FILTERS['source_ip']} GROUP BY 1""")
+                cursor.execute("COMMIT")
+
+            # Lookup/analytics indexes: recent list, per-IP history (seek + no sort), type breakdown
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_incidents_ts ON incidents(detection_timestamp DESC)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_incidents_iphash_ts ON incidents(source_ip_hash, detection_timestamp DESC)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_incidents_attack ON incidents(attack_type)")
+            cursor.execute("ANALYZE incidents") # Refresh planner stats so the indexes get picked
+
+            with _pool_lock:
+                if POOL is None: # Created after the WAL switch so every pooled connection sees it
+                    POOL = SqlitePool(SQLITE_POOL_SIZE)
+            logger.info(f"Database initialized/checked successfully at {DB_PATH}")
     except sqlite3.Error as e:
         logger.error(f"SQLite error during DB initialization: {e}", exc_info=True)
     except Exception as e:
         logger.error(f"Unexpected error during DB initialization: {e}", exc_info=True)
-    finally:
-        if conn:
-            conn.close()
 
 def add_incident(
     incident_id: str,
@@ -61,7 +310,8 @@ def add_incident(
     full_threat_data: Optional[dict] = None # The complete dict from aggregator
 ) -> Optional[str]:
     """
-    Adds a new incident to the local SQLite database.
+    Adds a new incident to the local SQLite database. While the API's flush loop is
+    running the row is queued and written with the next batch; otherwise it is written now.
 
     Args:
         incident_id (str): Unique ID for the incident.
@@ -78,26 +328,24 @@ def add_incident(
     Returns:
         Optional[str]: The incident_id if successful, else None.
     """
-    conn = None
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        # Serialize complex fields to JSON strings
-        layer_outputs_json = json.dumps(layer_outputs) if layer_outputs is not None else None
-        full_threat_data_json = json.dumps(full_threat_data) if full_threat_data is not None else None
-
-        cursor.execute('''
-            INSERT INTO incidents (
-                id, detection_timestamp, source_ip, attack_type, explanation,
-                confidence, ipfs_hash, blockchain_tx_hash, layer_outputs_json, full_threat_data_json
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        # The pipeline passes full_threat_data['layer_outputs'] as layer_outputs too; encode it only
+        # once, inside full_threat_data, and let get_incident_by_id derive it on read.
+        if full_threat_data is not None and layer_outputs is full_threat_data.get('layer_outputs'):
+            layer_outputs = None
+        # Serialize complex fields now, so later mutation of the dicts can't leak in
+        row = (
             incident_id, detection_timestamp, source_ip, attack_type, explanation,
-            confidence, ipfs_hash, blockchain_tx_hash, layer_outputs_json, full_threat_data_json
-        ))
-        conn.commit()
-        logger.info(f"Incident {incident_id} added to local database.")
+            confidence, ipfs_hash, blockchain_tx_hash, _pack_blob(layer_outputs), _pack_blob(full_threat_data)
+        )
+
+        if _flush_loop_running:
+            # The API's flush loop writes it with the next batch (within INCIDENT_FLUSH_INTERVAL_SECONDS)
+            _incident_queue.put(row)
+            logger.info(f"Incident {incident_id} queued for the local database.")
+        else:
+            add_incidents_bulk([row])
+            logger.info(f"Incident {incident_id} added to local database.")
         return incident_id
     except sqlite3.Error as e:
         logger.error(f"SQLite error adding incident {incident_id}: {e}", exc_info=True)
@@ -105,89 +353,189 @@ def add_incident(
     except Exception as e:
         logger.error(f"Unexpected error adding incident {incident_id}: {e}", exc_info=True)
         return None
+
+def _bump_write_version():
+    global _write_version
+    _write_version = next(_write_counter)
+
+def get_incidents_version() -> str:
+    """
+    Changes whenever the incidents table may have changed: the newest rowid catches inserts from any
+    process, the write counter catches this process's updates. For ETags on responses built from local incidents.
+    """
+    try:
+        with get_conn() as conn:
+            max_rowid = conn.execute("SELECT MAX(rowid) FROM incidents").fetchone()[0]
+    except sqlite3.Error as e:
+        logger.error(f"SQLite error reading incidents version: {e}")
+        max_rowid = None
+    return f"{max_rowid or 0}.{_write_version}"
+
+def add_incidents_bulk(rows: List[tuple]) -> int:
+    """
+    Inserts rows in a single transaction. Each row is the first 8 _SQL_INSERT columns (source_ip_hash
+    is derived here) followed by the packed layer_outputs and full_threat_data blobs. Returns the number written.
+    """
+    if not rows:
+        return 0
+    details = [(r[0], r[8], r[9]) for r in rows if r[8] is not None or r[9] is not None]
+    with get_conn() as conn:
+        # Take the write lock up front: one lock and one commit per batch, no upgrade from a read lock
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(_SQL_INSERT, [r[:8] + (_ip_hash(r[2]),) for r in rows])
+            if details:
+                conn.executemany(_SQL_INSERT_DETAILS, details)
+            conn.executemany(_SQL_ROLLUP_HOURLY, [(r[1], r[1]) for r in rows])
+            conn.executemany(_SQL_ROLLUP_ATTACK_TYPE, Counter(r[3] for r in rows if r[3]).items())
+            conn.executemany(_SQL_ROLLUP_SOURCE_IP, Counter(r[2] for r in rows if r[2] and r[2] != 'N/A').items())
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    _bump_write_version()
+    return len(rows)
+
+def _drain_incident_queue(max_items: int, timeout: float) -> List[tuple]:
+    """Blocks up to `timeout` for the first row, then takes whatever else is already queued."""
+    try:
+        batch = [_incident_queue.get(timeout=timeout)]
+    except queue.Empty:
+        return []
+    while len(batch) < max_items:
+        try:
+            batch.append(_incident_queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+def _write_incident_batch(batch: List[tuple]) -> int:
+    """
+    Writes a drained batch of queued incidents (already reported as stored by add_incident), retrying
+    transient errors and then inserting row by row. Only rows that fail on their own are dropped, each logged.
+    Returns the number of rows written.
+    """
+    for attempt in range(1, INCIDENT_WRITE_RETRIES + 1):
+        try:
+            return add_incidents_bulk(batch)
+        except sqlite3.OperationalError as e: # Locked/busy DB: worth another try
+            logger.warning(f"SQLite error flushing {len(batch)} queued incident(s) (attempt {attempt}/{INCIDENT_WRITE_RETRIES}): {e}")
+            if attempt < INCIDENT_WRITE_RETRIES:
+                time.sleep(INCIDENT_WRITE_RETRY_DELAY_SECONDS * attempt)
+        except sqlite3.Error as e: # e.g. a constraint violation: retrying the same rows won't help
+            logger.warning(f"SQLite error flushing {len(batch)} queued incident(s): {e}")
+            break
+
+    logger.warning(f"Writing {len(batch)} queued incident(s) one at a time.")
+    written = 0
+    for row in batch:
+        try:
+            written += add_incidents_bulk([row])
+        except sqlite3.Error as e:
+            logger.error(f"SQLite error writing queued incident {row[0]}; it was not stored: {e}", exc_info=True)
+    return written
+
+def flush_pending_incidents() -> int:
+    """Writes everything still queued (used on shutdown). Returns the number of rows written."""
+    written = 0
+    while True:
+        batch = _drain_incident_queue(INCIDENT_BATCH_SIZE, timeout=0)
+        if not batch:
+            return written
+        written += _write_incident_batch(batch)
+
+def _checkpoint_wal():
+    """PASSIVE checkpoint: copies committed WAL frames into the DB without blocking readers or writers."""
+    with get_conn() as conn:
+        conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+async def incident_flush_loop():
+    """
+    Background task (started by the API) that writes queued incidents in batches and
+    periodically checkpoints the WAL, so writers rarely hit the autocheckpoint inline.
+    """
+    global _flush_loop_running
+    _flush_loop_running = True
+    last_checkpoint = time.monotonic()
+    try:
+        while True:
+            if time.monotonic() - last_checkpoint >= WAL_CHECKPOINT_INTERVAL_SECONDS:
+                last_checkpoint = time.monotonic()
+                try:
+                    await asyncio.to_thread(_checkpoint_wal)
+                except sqlite3.Error as e:
+                    logger.warning(f"WAL checkpoint failed: {e}")
+            batch = await asyncio.to_thread(_drain_incident_queue, INCIDENT_BATCH_SIZE, INCIDENT_FLUSH_INTERVAL_SECONDS)
+            if not batch:
+                continue
+            written = await asyncio.to_thread(_write_incident_batch, batch)
+            logger.debug(f"Flushed {written} of {len(batch)} queued incident(s) to the local database.")
     finally:
-        if conn:
-            conn.close()
+        _flush_loop_running = False
+
+def update_incident_confidence(incident_id: str, confidence: float) -> bool:
+    """
+    Updates an incident's confidence score. Only the confidence column is written; the compressed
+    full_threat_data blob is left as is and get_incident_by_id overlays the column on read.
+    """
+    try:
+        with get_conn() as conn:
+            cursor = conn.execute("UPDATE incidents SET confidence = ? WHERE id = ?", (confidence, incident_id))
+        _bump_write_version()
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error(f"SQLite error updating confidence for incident {incident_id}: {e}", exc_info=True)
+        return False
 
 # --- Functions for fetching incidents (can be expanded later for analytics) ---
 def get_incident_by_id(incident_id: str) -> Optional[dict]:
-    conn = None
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row # Access columns by name
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM incidents WHERE id = ?", (incident_id,))
-        row = cursor.fetchone()
-        if row:
-            incident = dict(row)
-            # Deserialize JSON fields
-            if incident.get('layer_outputs_json'):
-                incident['layer_outputs'] = json.loads(incident['layer_outputs_json'])
-            if incident.get('full_threat_data_json'):
-                incident['full_threat_data'] = json.loads(incident['full_threat_data_json'])
-            return incident
-        return None
+        with get_conn() as conn:
+            row = conn.execute(_SQL_GET_BY_ID, (incident_id,)).fetchone()
+            if row:
+                incident = dict(row)
+                # Deserialize the detail blobs (or the legacy inline JSON columns for older rows)
+                layer_outputs = _unpack_blob(incident.pop('layer_outputs'))
+                full_threat_data = _unpack_blob(incident.pop('full_threat_data'))
+                legacy_layer_outputs = incident.pop('layer_outputs_json')
+                legacy_full_threat_data = incident.pop('full_threat_data_json')
+                if layer_outputs is None and legacy_layer_outputs:
+                    layer_outputs = _loads(legacy_layer_outputs)
+                if full_threat_data is None and legacy_full_threat_data:
+                    full_threat_data = _loads(legacy_full_threat_data)
+                if layer_outputs is None and isinstance(full_threat_data, dict):
+                    layer_outputs = full_threat_data.get('layer_outputs') # Stored once, inside full_threat_data
+                if isinstance(full_threat_data, dict) and incident['confidence'] is not None:
+                    # The column is authoritative (see update_incident_confidence); the blob is never rewritten
+                    full_threat_data['confidence'] = incident['confidence']
+                if layer_outputs is not None:
+                    incident['layer_outputs'] = layer_outputs
+                if full_threat_data is not None:
+                    incident['full_threat_data'] = full_threat_data
+                return incident
+            return None
     except sqlite3.Error as e:
         logger.error(f"SQLite error fetching incident {incident_id}: {e}", exc_info=True)
         return None
-    finally:
-        if conn:
-            conn.close()
 
 def get_recent_incidents(limit: int = 100) -> List[dict]:
-    conn = None
-    incidents_list = []
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        # Order by detection_timestamp descending to get recent ones
-        cursor.execute("SELECT * FROM incidents ORDER BY detection_timestamp DESC LIMIT ?", (limit,))
-        rows = cursor.fetchall()
-        for row in rows:
-            incident = dict(row)
-            if incident.get('layer_outputs_json'):
-                incident['layer_outputs'] = json.loads(incident['layer_outputs_json'])
-            # For a list view, maybe don't load full_threat_data_json unless needed
-            # if incident.get('full_threat_data_json'):
-            #     incident['full_threat_data'] = json.loads(incident['full_threat_data_json'])
-            incidents_list.append(incident)
-        return incidents_list
+        with get_conn() as conn:
+            # Order by detection_timestamp descending to get recent ones
+            return [dict(row) for row in conn.execute(_SQL_RECENT, (limit,)).fetchall()]
     except sqlite3.Error as e:
         logger.error(f"SQLite error fetching recent incidents: {e}", exc_info=True)
         return []
-    finally:
-        if conn:
-            conn.close()
 
 def get_incidents_by_ip(ip_address: str, limit: int = 10) -> List[dict]:
-    """Fetches the most recent incidents for a specific IP address."""
-    conn = None
-    incidents_list = []
+    """Fetches the most recent incidents for a specific IP address (list columns only, served via idx_incidents_iphash_ts)."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        query = """
-            SELECT * FROM incidents
-            WHERE source_ip = ?
-            ORDER BY detection_timestamp DESC
-            LIMIT ?
-        """
-        cursor.execute(query, (ip_address, limit))
-        rows = cursor.fetchall()
-        for row in rows:
-            incident = dict(row)
-            if incident.get('layer_outputs_json'):
-                incident['layer_outputs'] = json.loads(incident['layer_outputs_json'])
-            incidents_list.append(incident)
-        return incidents_list
+        with get_conn() as conn:
+            rows = conn.execute(_SQL_BY_IP, (_ip_hash(ip_address), ip_address, limit)).fetchall()
+            return [dict(row) for row in rows]
     except sqlite3.Error as e:
         logger.error(f"SQLite error fetching incidents for IP {ip_address}: {e}", exc_info=True)
         return []
-    finally:
-        if conn:
-            conn.close()
 
 
 # Initialize the database and table when this module is first imported or run.
@@ -195,121 +543,55 @@ def get_incidents_by_ip(ip_address: str, limit: int = 10) -> List[dict]:
 
 # --- Analytics Functions ---
 
+# strftime formats for get_threats_over_time
+_PERIOD_FMT = {
+    "hour": "%Y-%m-%d %H:00:00", # Groups by YYYY-MM-DD HH:00:00
+    "day": "%Y-%m-%d",
+    # Year-WeekNumber. '%W' weeks start on Monday; an ISO week ('%G-W%V') would need date
+    # arithmetic SQLite's strftime doesn't offer, so this simpler grouping is used.
+    "week": "%Y-%W",
+    "month": "%Y-%m-01", # Group by start of month
+}
+
 def get_threats_over_time(period: str = "day", limit: int = 30) -> List[Dict[str, Any]]:
     """
     Aggregates incident counts by time periods.
     Supported periods: 'hour', 'day', 'week', 'month'.
     """
-    conn = None
-    results = []
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        # Choose date formatting string based on period
-        if period == "hour":
-            # Groups by YYYY-MM-DD HH:00:00
-            date_format_str = "%Y-%m-%d %H:00:00"
-        elif period == "week":
-            # Groups by Year and Week Number (ISO week date)
-            # SQLite's strftime '%W' gives week of year (Sun-Sat), '%Y' gives year.
-            # For ISO week (Mon-Sun), '%G-W%V' is better but might need custom handling or date library.
-            # Simpler: group by start of the week (Monday). strftime('%w') is day of week (0=Sun, 1=Mon,...6=Sat)
-            # To get Monday as start of week: date(detection_timestamp, '-' || (strftime('%w', detection_timestamp) - 1) || ' days')
-            # For simplicity, let's use '%Y-%W' (Year-WeekNumber) which is common though week start might vary by locale/SQLite version.
-            # A more robust way involves date arithmetic to find start of ISO week.
-            # For now, using a simpler grouping for demonstration.
-            date_format_str = "%Y-%W" # Year-WeekNumber (locale dependent start of week)
-        elif period == "month":
-            date_format_str = "%Y-%m-01" # Group by start of month
-        elif period == "day": # Default
-            date_format_str = "%Y-%m-%d"
-        else:
-            logger.warning(f"Unsupported period '{period}' for threats_over_time. Defaulting to 'day'.")
-            date_format_str = "%Y-%m-%d"
-
-        # Ensure detection_timestamp is correctly handled as TEXT ISO8601 format for strftime
-        query = f"""
-            SELECT
-                strftime('{date_format_str}', detection_timestamp) as period_start,
-                COUNT(id) as incident_count
-            FROM incidents
-            GROUP BY period_start
-            ORDER BY period_start DESC
-            LIMIT ?
-        """
-        cursor.execute(query, (limit,))
-        rows = cursor.fetchall()
-        for row in rows:
-            results.append({"period_start": row[0], "count": row[1]})
-
-        # Reverse to have chronological order for charts
-        results.reverse()
-        return results
+        with get_conn() as conn:
+            date_format_str = _PERIOD_FMT.get(period)
+            if date_format_str is None:
+                logger.warning(f"Unsupported period '{period}' for threats_over_time. Defaulting to 'day'.")
+                date_format_str = _PERIOD_FMT["day"]
+
+            # Ensure detection_timestamp is correctly handled as TEXT ISO8601 format for strftime
+            rows = conn.execute(_SQL_THREATS_OVER_TIME, (date_format_str, limit)).fetchall()
+            return [{"period_start": period_start, "count": count} for period_start, count in rows]
 
     except sqlite3.Error as e:
         logger.error(f"SQLite error in get_threats_over_time (period: {period}): {e}", exc_info=True)
         return []
-    finally:
-        if conn:
-            conn.close()
 
 def get_attack_type_distribution() -> List[Dict[str, Any]]:
     """Counts occurrences of each attack_type."""
-    conn = None
-    results = []
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        query = """
-            SELECT
-                attack_type,
-                COUNT(id) as incident_count
-            FROM incidents
-            WHERE attack_type IS NOT NULL AND attack_type != ''
-            GROUP BY attack_type
-            ORDER BY incident_count DESC
-        """
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        for row in rows:
-            results.append({"attack_type": row[0], "count": row[1]})
-        return results
+        with get_conn() as conn:
+            rows = conn.execute(_SQL_ATTACK_TYPES).fetchall()
+            return [{"attack_type": attack_type, "count": count} for attack_type, count in rows]
     except sqlite3.Error as e:
         logger.error(f"SQLite error in get_attack_type_distribution: {e}", exc_info=True)
         return []
-    finally:
-        if conn:
-            conn.close()
 
 def get_top_offending_ips(limit: int = 10) -> List[Dict[str, Any]]:
     """Counts incidents per source_ip and returns the top N."""
-    conn = None
-    results = []
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        query = """
-            SELECT
-                source_ip,
-                COUNT(id) as incident_count
-            FROM incidents
-            WHERE source_ip IS NOT NULL AND source_ip != '' AND source_ip != 'N/A'
-            GROUP BY source_ip
-            ORDER BY incident_count DESC
-            LIMIT ?
-        """
-        cursor.execute(query, (limit,))
-        rows = cursor.fetchall()
-        for row in rows:
-            results.append({"source_ip": row[0], "count": row[1]})
-        return results
+        with get_conn() as conn:
+            rows = conn.execute(_SQL_TOP_IPS, (limit,)).fetchall()
+            return [{"source_ip": source_ip, "count": count} for source_ip, count in rows]
     except sqlite3.Error as e:
         logger.error(f"SQLite error in get_top_offending_ips: {e}", exc_info=True)
         return []
-    finally:
-        if conn:
-            conn.close()
 
 
 if __name__ == '__main__':
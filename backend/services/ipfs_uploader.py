@@ -1,5 +1,13 @@
 import os
 import json
+import logging
+import threading
+from typing import Optional
+
+try:
+    import orjson # Faster JSON (de)serialization; optional, falls back to json
+except ImportError:
+    orjson = None
 import ipfshttpclient # Ensure this is in requirements.txt
 
 import config # For logger and potentially IPFS API URL from config
@@ -12,6 +20,36 @@ IPFS_API_URL = os.getenv("ZERO_HACK_IPFS_API_URL", "/ip4/127.0.0.1/tcp/5001")
 # e.g., /dns/ipfs-node.example.com/tcp/5001/http or just the multiaddr.
 # The ipfshttpclient.connect() call often handles parsing this.
 
+# One long-lived client per process; connecting per upload redid the HTTP session setup every time.
+_ipfs_client: Optional[ipfshttpclient.Client] = None
+_ipfs_lock = threading.Lock()
+
+# The pipeline runs in the API's worker threads (off the event loop); this caps how many of them
+# add to the daemon at once so a burst of incidents doesn't swamp it.
+IPFS_MAX_CONCURRENT_UPLOADS = int(os.getenv("ZERO_HACK_IPFS_MAX_CONCURRENT_UPLOADS", "8"))
+_upload_semaphore = threading.BoundedSemaphore(IPFS_MAX_CONCURRENT_UPLOADS)
+
+def _get_ipfs_client() -> ipfshttpclient.Client:
+    """Returns the shared IPFS client, connecting on first use (raises if the daemon is unreachable)."""
+    global _ipfs_client
+    if _ipfs_client is None:
+        with _ipfs_lock:
+            if _ipfs_client is None:
+                logger.info(f"IPFS Uploader: Connecting to IPFS daemon at {IPFS_API_URL}...")
+                _ipfs_client = ipfshttpclient.connect(addr=IPFS_API_URL, session=True)
+    return _ipfs_client
+
+def close_ipfs_client():
+    """Closes the shared IPFS client session (called on API shutdown). Safe to call if never connected."""
+    global _ipfs_client
+    with _ipfs_lock:
+        client, _ipfs_client = _ipfs_client, None
+    if client:
+        try:
+            client.close() # Close the session
+        except Exception as e_close:
+            logger.error(f"IPFS Uploader: Error closing IPFS client session: {e_close}")
+
 def upload_incident_details_to_ipfs(incident_details_dict: dict, filename_suggestion: str = "incident_details.json"):
     """
     Uploads a dictionary of incident details (serialized as JSON) to IPFS.
@@ -28,64 +66,38 @@ def upload_incident_details_to_ipfs(incident_details_dict: dict, filename_sugges
         return None
 
     try:
-        # Serialize the dictionary to a JSON string
-        json_content = json.dumps(incident_details_dict, indent=2)
-    except TypeError as e:
+        # Serialize the dictionary to compact JSON bytes (nothing reads the pinned blob by eye)
+        if orjson:
+            # The AI pipeline's results can carry numpy scalars/arrays
+            json_content = orjson.dumps(incident_details_dict, option=orjson.OPT_SERIALIZE_NUMPY)
+        else:
+            json_content = json.dumps(incident_details_dict, separators=(",", ":")).encode("utf-8")
+    except TypeError as e: # orjson.JSONEncodeError subclasses TypeError
         logger.error(f"IPFS Uploader: Failed to serialize incident details to JSON: {e}")
         return None
 
-    client = None
     try:
-        logger.info(f"IPFS Uploader: Attempting to connect to IPFS daemon at {IPFS_API_URL}...")
-        # The `connect=True` parameter explicitly tries to connect and raises an error if it fails.
-        # The address format should be a multiaddr.
-        client = ipfshttpclient.connect(addr=IPFS_API_URL, session=True) # session=True can improve performance for multiple calls
-
-        # Check connection (optional, as connect() should raise error if daemon not reachable)
-        # try:
-        #     client.id() # A simple call to check if connection is working
-        #     logger.info("IPFS Uploader: Successfully connected to IPFS daemon.")
-        # except Exception as conn_err:
-        #     logger.error(f"IPFS Uploader: Failed to verify connection to IPFS daemon at {IPFS_API_URL}. Error: {conn_err}")
-        #     if client: client.close()
-        #     return None
-
-        # Add the JSON string content to IPFS.
-        # Using add_str which is simpler than add_bytes or writing to a temp file for strings.
-        # The 'wrap_with_directory' and 'pin' options can be useful.
-        # Pinning ensures the data is kept by your local node until explicitly unpinned.
-        # For this use case, we'll add the string directly.
-        # The result is a dictionary (or list of dicts if multiple files). We expect one.
-
-        # Using add_str for direct string upload
-        # For metadata like filename, it's better to wrap in a directory or use MFS if more complex structure needed.
-        # For a single JSON string, add_str is fine. The "name" is not directly stored with raw content this way.
-        # If filename is important, consider client.add(io.BytesIO(json_content.encode()), name=filename_suggestion)
-
-        # Using add_json (if available and suitable - it adds Python dicts directly)
-        # result = client.add_json(incident_details_dict) # This directly takes a dict
-
-        # Let's stick to add_str for explicit JSON string control
-        result = client.add_str(json_content, pin=True) # Pinning is usually desired
-
-        ipfs_hash = result # For add_str, result is the CID string. For add_json, it's a dict {'Hash': cid}
-        # If using add_json, it would be: ipfs_hash = result['Hash']
+        with _upload_semaphore:
+            client = _get_ipfs_client()
+            try:
+                # The payload is already bytes, so add_bytes avoids add_str's encode; pinning keeps the data on our node.
+                ipfs_hash = client.add_bytes(json_content, pin=True) # Returns the CID string
+            except ipfshttpclient.exceptions.ConnectionError:
+                # The daemon may have restarted since the shared session was opened: reconnect once.
+                logger.warning("IPFS Uploader: Lost connection to IPFS daemon, reconnecting...")
+                close_ipfs_client()
+                ipfs_hash = _get_ipfs_client().add_bytes(json_content, pin=True)
 
         logger.info(f"IPFS Uploader: Successfully uploaded incident details. IPFS Hash (CID): {ipfs_hash}")
         return ipfs_hash
 
     except ipfshttpclient.exceptions.ConnectionError as e:
         logger.error(f"IPFS Uploader: Could not connect to IPFS daemon at {IPFS_API_URL}. Is it running? Error: {e}")
+        close_ipfs_client()
         return None
     except Exception as e:
-        logger.error(f"IPFS Uploader: An unexpected error occurred during IPFS upload: {e}", exc_info=True)
+        logger.error(f"IPFS Uploader: An unexpected error occurred during IPFS upload: {e}", exc_info=logger.isEnabledFor(logging.DEBUG))
         return None
-    finally:
-        if client:
-            try:
-                client.close() # Close the session
-            except Exception as e_close:
-                logger.error(f"IPFS Uploader: Error closing IPFS client session: {e_close}")
 
 
 if __name__ == '__main__':
@@ -1,4 +1,5 @@
 import os
+import threading
 import joblib
 import numpy as np
 import pandas as pd
@@ -7,6 +8,20 @@ from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dropout, BatchNormalization, TimeDistributed, Dense
 from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint, ReduceLROnPlateau
 from sklearn.preprocessing import MinMaxScaler
+try:
+    # Optional: file-change notifications for the detector's model hot-reload (mtime polling otherwise)
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = FileSystemEventHandler = None
+try:
+    # Optional: Arrow's multi-threaded streaming CSV reader for dataset loading (pandas chunks otherwise),
+    # and Parquet datasets, which need it
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pa_csv = pq = None
 
 import config # Import new config file
 
@@ -14,6 +29,11 @@ logger = config.get_logger(__name__)
 
 # Default timesteps for LSTM sequences
 TIMESTEPS = 10
+# Rows read up front to work out which CSV columns are numeric
+CSV_SNIFF_ROWS = 1000
+_INF_STRINGS = ["inf", "-inf", "Infinity", "-Infinity"]
+CSV_CHUNK_ROWS = 200_000
+CSV_ARROW_BLOCK_BYTES = 64 << 20 # Arrow parses the CSV in blocks of this size, one record batch each
 
 def setup_gpu():
     gpus = tf.config.experimental.list_physical_devices('GPU')
@@ -22,6 +42,9 @@ def setup_gpu():
             for gpu in gpus:
                 tf.config.experimental.set_memory_growth(gpu, True)
             logger.info(f"Using GPU: {gpus}")
+            # FP16 compute with FP32 variables on Tensor Core GPUs; build_lstm keeps the output layer in FP32
+            tf.keras.mixed_precision.set_global_policy('mixed_float16')
+            logger.info("Mixed precision policy 'mixed_float16' enabled for training.")
         except RuntimeError as e:
             logger.error(f"GPU setup error: {e}")
     else:
@@ -36,66 +59,239 @@ def find_label_column_name(df_columns):
     logger.info("No column containing 'label' (case-insensitive) found in provided columns.")
     return None
 
+def _scaled_array_path(csv_path):
+    """Where the scaled float32 matrix for `csv_path` is written."""
+    return csv_path + ".scaled.npy"
+
+def _scaled_meta_path(csv_path):
+    """Sidecar recording how the cached .npy was produced (scaler, label column, fitted or not)."""
+    return _scaled_array_path(csv_path) + ".meta"
+
+def _same_scaling(scaler_a, scaler_b):
+    try:
+        return np.array_equal(scaler_a.scale_, scaler_b.scale_) and np.array_equal(scaler_a.min_, scaler_b.min_)
+    except AttributeError: # Not fitted / not a MinMaxScaler
+        return False
+
+def _load_scaled_cache(path, scaler_to_use, label_column_name):
+    """
+    Returns (X_scaled memmap, scaler) from a previous run if the cache is newer than the CSV and
+    was produced the same way, else None.
+    """
+    out_path, meta_path = _scaled_array_path(path), _scaled_meta_path(path)
+    try:
+        csv_mtime = os.path.getmtime(path)
+        if os.path.getmtime(out_path) < csv_mtime or os.path.getmtime(meta_path) < csv_mtime:
+            return None
+        meta = joblib.load(meta_path)
+    except Exception: # Missing or unreadable cache: just rebuild it
+        return None
+    if meta.get("label_column_name") != label_column_name:
+        return None
+    if scaler_to_use is None:
+        if not meta.get("fitted"):
+            return None # Cached data was scaled with someone else's scaler
+        scaler = meta["scaler"]
+    elif _same_scaling(meta["scaler"], scaler_to_use):
+        scaler = scaler_to_use
+    else:
+        return None
+    return np.load(out_path, mmap_mode='r'), scaler
+
+def _is_parquet(path):
+    return path.endswith(".parquet")
+
+def csv_to_parquet(csv_path, parquet_path=None):
+    """
+    One-time conversion of a training CSV to zstd Parquet (default: same name, .parquet), streamed block by block.
+    Loaders then read only the numeric columns they need instead of re-parsing the whole CSV.
+    Returns the Parquet path, or None if pyarrow is missing or the conversion failed.
+    """
+    if pq is None:
+        logger.warning("pyarrow is not installed; cannot convert CSV datasets to Parquet.")
+        return None
+    parquet_path = parquet_path or os.path.splitext(csv_path)[0] + ".parquet"
+    try:
+        with pa_csv.open_csv(csv_path, read_options=pa_csv.ReadOptions(block_size=CSV_ARROW_BLOCK_BYTES)) as reader:
+            with pq.ParquetWriter(parquet_path, reader.schema, compression='zstd') as writer:
+                for batch in reader:
+                    writer.write_batch(batch)
+    except Exception as e: # e.g. a column typed from the first block has incompatible values further down
+        logger.error(f"Error converting {csv_path} to Parquet: {e}")
+        if os.path.exists(parquet_path):
+            os.remove(parquet_path) # Never leave a partial file that looks up to date
+        return None
+    logger.info(f"✅ Converted {csv_path} to Parquet: {parquet_path}")
+    return parquet_path
+
+def _prefer_parquet(csv_path):
+    """`csv_path`'s Parquet copy, converting it first if missing or older than the CSV; the CSV itself without pyarrow or if that fails."""
+    if pq is None:
+        return csv_path
+    parquet_path = os.path.splitext(csv_path)[0] + ".parquet"
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path):
+        return parquet_path
+    return csv_to_parquet(csv_path, parquet_path) or csv_path
+
+def _arrow_numeric_chunks(batches):
+    """float32 arrays from Arrow record batches of numeric columns, with NaN/inf rows dropped."""
+    for batch in batches:
+        # Nulls come out as NaN, and are dropped with non-finite rows below
+        X_chunk = np.column_stack([column.to_numpy(zero_copy_only=False).astype(np.float32, copy=False)
+                                   for column in batch.columns])
+        X_chunk = X_chunk[np.isfinite(X_chunk).all(axis=1)]
+        if len(X_chunk):
+            yield X_chunk
+
+def _iter_numeric_chunks_arrow(path, numeric_cols):
+    """_iter_numeric_chunks() through pyarrow: blocks are parsed in parallel straight into float32 columns."""
+    convert_options = pa_csv.ConvertOptions(
+        include_columns=numeric_cols,
+        column_types={col: pa.float32() for col in numeric_cols},
+        null_values=pa_csv.ConvertOptions().null_values + _INF_STRINGS, # Keep the defaults ("", "NaN", ...)
+    )
+    with pa_csv.open_csv(path, read_options=pa_csv.ReadOptions(block_size=CSV_ARROW_BLOCK_BYTES),
+                         convert_options=convert_options) as reader:
+        yield from _arrow_numeric_chunks(reader)
+
+def _iter_numeric_chunks(path, numeric_cols):
+    """
+    Yields the numeric columns of `path` as float32 arrays with NaN/inf rows dropped, one chunk at a time
+    (CSV_CHUNK_ROWS rows with pandas or from Parquet, CSV_ARROW_BLOCK_BYTES blocks with pyarrow).
+    """
+    if _is_parquet(path):
+        # Column projection: only the numeric columns' pages are read and decoded
+        yield from _arrow_numeric_chunks(pq.ParquetFile(path).iter_batches(batch_size=CSV_CHUNK_ROWS, columns=numeric_cols))
+        return
+    if pa_csv is not None:
+        yield from _iter_numeric_chunks_arrow(path, numeric_cols)
+        return
+    # float32 halves memory and bandwidth vs. the default float64; text infinities become NaN
+    for chunk in pd.read_csv(path, usecols=numeric_cols, dtype=np.float32, engine='c',
+                             na_values=_INF_STRINGS, chunksize=CSV_CHUNK_ROWS):
+        X_chunk = chunk.to_numpy(dtype=np.float32, copy=False)
+        # One mask drops NaN and inf rows (values beyond float32 range parse as inf)
+        X_chunk = X_chunk[np.isfinite(X_chunk).all(axis=1)]
+        if len(X_chunk):
+            yield X_chunk
+
+def _count_rows_and_fit(path, numeric_cols, scaler=None):
+    """Number of usable rows in `path`, partial-fitting `scaler` (if given) chunk by chunk on the way."""
+    n_rows = 0
+    for X_chunk in _iter_numeric_chunks(path, numeric_cols):
+        n_rows += len(X_chunk)
+        if scaler is not None:
+            scaler.partial_fit(X_chunk)
+    return n_rows
+
+def _non_numeric_columns(path, numeric_cols):
+    """Columns of `numeric_cols` that hold text somewhere in the CSV (per-chunk dtype inference, no forced float32)."""
+    non_numeric = set()
+    for chunk in pd.read_csv(path, usecols=numeric_cols, na_values=_INF_STRINGS, chunksize=CSV_CHUNK_ROWS):
+        non_numeric.update(col for col in chunk.columns if not pd.api.types.is_numeric_dtype(chunk[col]))
+    return [col for col in numeric_cols if col in non_numeric]
+
 def load_and_preprocess_dataset(path, scaler_to_use=None, label_column_name=None):
     """
     Loads dataset, optionally drops label, selects numeric, handles NaN/inf.
     If scaler_to_use is None, fits a new scaler. Otherwise, uses the provided scaler.
-    Returns X_scaled (features) and the scaler used.
+    The CSV (or Parquet, by .parquet suffix) is streamed in chunks and the scaled matrix written to a .npy next to it.
+    Returns X_scaled (features, a read-only float32 memmap) and the scaler used.
     """
     logger.info(f"Loading and preprocessing dataset: {path}")
+    cached = _load_scaled_cache(path, scaler_to_use, label_column_name)
+    if cached is not None:
+        logger.info(f"Using cached scaled data for {path} (CSV unchanged since {_scaled_array_path(path)} was written). Shape: {cached[0].shape}")
+        return cached
+    requested_label_column = label_column_name # Cache key; label_column_name may be auto-detected below
+
     try:
-        df = pd.read_csv(path)
+        if _is_parquet(path):
+            if pq is None:
+                logger.error(f"pyarrow is required to read Parquet dataset {path}.")
+                return None, None
+            # The schema says which columns are numeric, no rows need to be read
+            schema = pq.read_schema(path)
+            columns = schema.names
+            numeric_in_file = [field.name for field in schema
+                               if pa.types.is_integer(field.type) or pa.types.is_floating(field.type)]
+        else:
+            # A small sample decides which columns are numeric; the full read then parses only those
+            sample_df = pd.read_csv(path, nrows=CSV_SNIFF_ROWS)
+            columns = list(sample_df.columns)
+            numeric_in_file = list(sample_df.select_dtypes(include=[np.number]).columns)
     except FileNotFoundError:
         logger.error(f"File not found: {path}")
         return None, None
     except Exception as e:
-        logger.error(f"Error reading CSV {path}: {e}")
+        logger.error(f"Error reading dataset {path}: {e}")
         return None, None
 
     # If label_column_name is not provided, try to find it
     if label_column_name is None:
-        label_column_name = find_label_column_name(df.columns)
+        label_column_name = find_label_column_name(columns)
 
-    if label_column_name and label_column_name in df.columns:
-        X_df = df.drop(columns=[label_column_name])
+    if label_column_name and label_column_name in columns:
         logger.info(f"Dropped label column '{label_column_name}' for feature set X from {path}.")
     else:
         if label_column_name: # It was provided but not found
              logger.warning(f"Specified label column '{label_column_name}' not found in {path}. Using all columns.")
-        X_df = df
-
-    X_numeric = X_df.select_dtypes(include=[np.number])
 
-    if X_numeric.empty:
+    numeric_cols = [col for col in numeric_in_file if col != label_column_name]
+    if not numeric_cols:
         logger.warning(f"No numeric features found in {path} after potential label drop. Cannot proceed with this file.")
         return None, None
 
-    X_numeric.replace([np.inf, -np.inf], np.nan, inplace=True)
-    X_numeric.dropna(inplace=True)
-
-    if X_numeric.empty:
-        logger.warning(f"DataFrame from {path} is empty after NaN removal.")
-        return None, None
-
-    X_values = X_numeric.values
-
-    current_scaler = scaler_to_use
-    if current_scaler is None:
-        logger.info(f"Fitting a new MinMaxScaler for {path}.")
-        current_scaler = MinMaxScaler()
-        X_scaled = current_scaler.fit_transform(X_values)
-    else:
-        logger.info(f"Using provided scaler to transform {path}.")
+    fitting = scaler_to_use is None
+    current_scaler = MinMaxScaler() if fitting else scaler_to_use
+    out_path, meta_path = _scaled_array_path(path), _scaled_meta_path(path)
+    try:
+        if os.path.exists(meta_path):
+            os.remove(meta_path) # Invalidate first, so an interrupted rewrite is never reused
+        # Pass 1: count usable rows (and fit the scaler) holding one chunk in memory at a time
         try:
-            X_scaled = current_scaler.transform(X_values)
-        except Exception as e:
-            logger.error(f"Error transforming data from {path} with provided scaler: {e}")
-            return None, current_scaler # Return scaler for potential saving attempt
-
+            n_rows = _count_rows_and_fit(path, numeric_cols, current_scaler if fitting else None)
+        except ValueError as e: # Includes pyarrow's ArrowInvalid
+            # A column that looked numeric in the sample has text further down: drop it, as a
+            # full-file select_dtypes would have, and start over without it
+            dropped = _non_numeric_columns(path, numeric_cols)
+            if not dropped:
+                raise
+            logger.warning(f"Dropping column(s) {dropped} from {path}: non-numeric values after the first {CSV_SNIFF_ROWS} rows ({e}).")
+            numeric_cols = [col for col in numeric_cols if col not in dropped]
+            if not numeric_cols:
+                logger.warning(f"No numeric features left in {path}. Cannot proceed with this file.")
+                return None, None
+            if fitting:
+                current_scaler = MinMaxScaler() # Discard the partial fit over the dropped columns
+            n_rows = _count_rows_and_fit(path, numeric_cols, current_scaler if fitting else None)
+        if n_rows == 0:
+            logger.warning(f"DataFrame from {path} is empty after NaN removal.")
+            return None, None
+        logger.info(f"{'Fitting a new MinMaxScaler' if fitting else 'Using provided scaler'} for {path} ({n_rows} rows).")
+
+        # Pass 2: scale each chunk into an on-disk float32 .npy
+        X_out = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float32, shape=(n_rows, len(numeric_cols)))
+        offset = 0
+        for X_chunk in _iter_numeric_chunks(path, numeric_cols):
+            X_out[offset:offset + len(X_chunk)] = current_scaler.transform(X_chunk)
+            offset += len(X_chunk)
+        X_out.flush()
+        del X_out
+        joblib.dump({"scaler": current_scaler, "fitted": fitting, "label_column_name": requested_label_column}, meta_path)
+    except Exception as e: # e.g. a column that looked numeric in the sample has text further down
+        logger.error(f"Error reading or scaling numeric columns from CSV {path}: {e}")
+        return None, (None if fitting else current_scaler) # Return a provided scaler for potential saving attempt
+
+    X_scaled = np.load(out_path, mmap_mode='r') # Pages in on demand, so RSS stays at O(chunk)
     logger.info(f"Successfully preprocessed and scaled data from {path}. Shape: {X_scaled.shape}")
     return X_scaled, current_scaler
 
-def reshape_sequences(X, timesteps=TIMESTEPS):
+def reshape_sequences(X, timesteps=TIMESTEPS, stride=1):
+    """
+    Turns [samples, features] into overlapping windows [num_sequences, timesteps, features].
+    The result is a read-only strided view of X (no copy); stride > 1 subsamples the windows.
+    """
     if X is None or len(X) == 0:
         logger.warning("Input data for reshaping is None or empty.")
         return None
@@ -103,63 +299,235 @@ def reshape_sequences(X, timesteps=TIMESTEPS):
         logger.warning(f"Not enough data ({len(X)} samples) to form even one sequence of {timesteps} timesteps.")
         return None
 
-    # Ensure data length is a multiple of timesteps by truncating
-    num_sequences = len(X) // timesteps
-    cut_point = num_sequences * timesteps
-    X_trimmed = X[:cut_point]
-
-    # Reshape [samples, features] into [num_sequences, timesteps, features]
-    num_features = X_trimmed.shape[1]
-    X_reshaped = X_trimmed.reshape(-1, timesteps, num_features)
-    logger.info(f"Data reshaped into sequences: {X_reshaped.shape}")
-    return X_reshaped
+    # One window per start row: n - timesteps + 1 sequences, no rows dropped
+    X_windows = np.lib.stride_tricks.sliding_window_view(X, window_shape=(timesteps, X.shape[1]))[:, 0]
+    if stride > 1:
+        X_windows = X_windows[::stride]
+    logger.info(f"Data reshaped into sequences: {X_windows.shape}")
+    return X_windows
 
 def build_lstm(input_shape):
     # input_shape will be (timesteps, num_features)
-    # Architecture: LSTM(64, rs=T) -> BN -> Dropout(0.4) -> LSTM(32, rs=T) -> BN -> Dropout(0.4) -> TimeDistributed(Dense(num_features))
+    # Architecture: BN -> LSTM(64, rs=T) -> Dropout(0.4) -> LSTM(32, rs=T) -> Dropout(0.4) -> TimeDistributed(Dense(num_features))
+    # Both LSTMs keep the cuDNN-compatible defaults (tanh/sigmoid, no recurrent dropout, no unroll) so
+    # TF dispatches the fused cuDNN kernel on GPU; normalization is applied to the input only.
     logger.info(f"Building LSTM model with input_shape: {input_shape}")
+    cudnn_kwargs = dict(activation='tanh', recurrent_activation='sigmoid', recurrent_dropout=0.0, unroll=False, use_bias=True)
     model = Sequential([
-        LSTM(64, return_sequences=True, input_shape=input_shape),
-        BatchNormalization(),
+        BatchNormalization(input_shape=input_shape),
+        LSTM(64, return_sequences=True, **cudnn_kwargs),
         Dropout(0.4),
-        LSTM(32, return_sequences=True), # Set return_sequences=True if the next layer is also recurrent or TimeDistributed
-        BatchNormalization(),
+        LSTM(32, return_sequences=True, **cudnn_kwargs), # Set return_sequences=True if the next layer is also recurrent or TimeDistributed
         Dropout(0.4),
-        TimeDistributed(Dense(input_shape[-1])) # Output layer, predicting features for each timestep
+        # Output layer, predicting features for each timestep. Always FP32, so under mixed precision
+        # the reconstruction and its MSE loss don't underflow.
+        TimeDistributed(Dense(input_shape[-1], dtype='float32'), dtype='float32')
     ], name="lstm_autoencoder")
 
+    if tf.config.list_logical_devices('GPU'):
+        lstm_layers = [layer for layer in model.layers if isinstance(layer, LSTM)]
+        # Private Keras 2 attribute; reported as unknown on Keras versions without it
+        cudnn_flags = [getattr(layer, '_could_use_gpu_kernel', 'unknown') for layer in lstm_layers]
+        logger.info(f"LSTM layers eligible for the fused cuDNN kernel: {cudnn_flags}")
+
     logger.info("LSTM model built.")
     model.summary(print_fn=logger.info)
     return model
 
-def train_lstm(X_seq, model_save_path, epochs=30, batch_size=64):
+def _window_batches(X_seq, batch_size, shuffle):
+    """
+    Generator factory for tf.data: gathers [batch, timesteps, features] float32 batches out of
+    the window view, so at most a few batches of windows are ever materialised.
+    """
+    def generate():
+        order = np.random.permutation(len(X_seq)) if shuffle else np.arange(len(X_seq))
+        for start in range(0, len(order), batch_size):
+            # A fresh array per batch: tf.data may wrap it without copying while prefetched
+            # batches are still queued, so a reused buffer could be overwritten under them
+            yield np.asarray(X_seq[order[start:start + batch_size]], dtype=np.float32)
+    return generate
+
+def split_train_val(X_seq, validation_fraction=0.1):
+    """
+    Holds out the last `validation_fraction` of sequences, like the former validation_split.
+    The timesteps-1 windows straddling the boundary are dropped so the two sets share no rows.
+    """
+    n_val = max(1, int(len(X_seq) * validation_fraction))
+    gap = X_seq.shape[1] - 1
+    if len(X_seq) - n_val - gap < 1:
+        gap = 0 # Too few sequences to afford the gap
+    return X_seq[:len(X_seq) - n_val - gap], X_seq[len(X_seq) - n_val:]
+
+def make_datasets(X_seq, batch_size, validation_fraction=0.1):
+    """
+    Shuffled, prefetched tf.data pipelines (input == target for the autoencoder), split by split_train_val().
+    Windows are gathered per batch from X_seq (a view), so memory stays O(batch), not O(N * timesteps).
+    """
+    X_train, X_val = split_train_val(X_seq, validation_fraction)
+    spec = tf.TensorSpec((None,) + X_seq.shape[1:], tf.float32)
+
+    train_ds = (tf.data.Dataset.from_generator(_window_batches(X_train, batch_size, shuffle=True), output_signature=spec)
+                .map(lambda x: (x, x))
+                .prefetch(tf.data.AUTOTUNE)) # Overlaps host-side batching with the training step
+    val_ds = (tf.data.Dataset.from_generator(_window_batches(X_val, batch_size, shuffle=False), output_signature=spec)
+              .map(lambda x: (x, x))
+              .prefetch(tf.data.AUTOTUNE))
+    if tf.config.list_physical_devices('GPU'):
+        # Stage the next batches in GPU memory so the host-to-device copy overlaps the current step
+        train_ds = train_ds.apply(tf.data.experimental.prefetch_to_device('/GPU:0', buffer_size=2))
+        val_ds = val_ds.apply(tf.data.experimental.prefetch_to_device('/GPU:0', buffer_size=2))
+    return train_ds, val_ds
+
+def train_lstm(X_seq, model_save_path, epochs=30, batch_size=64, threshold_save_path=config.LSTM_THRESHOLD_PATH):
     logger.info("Starting LSTM model training...")
     # X_seq.shape is (num_sequences, timesteps, num_features)
     # The input_shape for the first LSTM layer is (timesteps, num_features)
     model = build_lstm(X_seq.shape[1:])
-    model.compile(optimizer='adam', loss='mse') # Mean Squared Error for reconstruction
-
+    optimizer = tf.keras.optimizers.Adam()
+    if tf.keras.mixed_precision.global_policy().name == 'mixed_float16':
+        optimizer = tf.keras.mixed_precision.LossScaleOptimizer(optimizer) # Dynamic loss scaling against FP16 gradient underflow
+    # XLA fuses the LSTM gate element-wise ops; the first epoch pays the compile time
+    model.compile(optimizer=optimizer, loss='mse', jit_compile=True) # Mean Squared Error for reconstruction
+
+    # Checkpoints, threshold and TFLite copy go to staging paths; a running detector only sees the finished set
+    staged_model_path = _staging_path(model_save_path)
+    staged_threshold_path = _staging_path(threshold_save_path)
     callbacks = [
         EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True, verbose=1),
-        ModelCheckpoint(model_save_path, save_best_only=True, monitor='val_loss', verbose=1),
+        ModelCheckpoint(staged_model_path, save_best_only=True, monitor='val_loss', verbose=1),
         ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=3, verbose=1, min_lr=1e-6)
     ]
 
-    history = model.fit(X_seq, X_seq, # LSTM autoencoder reconstructs its input sequences
-                        epochs=epochs,
-                        batch_size=batch_size,
-                        validation_split=0.1,
-                        callbacks=callbacks,
-                        verbose=2)
+    train_ds, val_ds = make_datasets(X_seq, batch_size)
+    try:
+        history = model.fit(train_ds,
+                            validation_data=val_ds,
+                            epochs=epochs,
+                            callbacks=callbacks,
+                            verbose=2)
+    except tf.errors.InvalidArgumentError as e: # Op or kernel XLA can't compile on this device
+        logger.warning(f"XLA compilation failed ({e}); retraining without jit_compile.")
+        model.compile(optimizer=optimizer, loss='mse', jit_compile=False)
+        history = model.fit(train_ds,
+                            validation_data=val_ds,
+                            epochs=epochs,
+                            callbacks=callbacks,
+                            verbose=2)
+
+    logger.info(f"✅ LSTM model training complete. Best model saved to: {staged_model_path}")
+
+    # The checkpoint holds the best epoch, which the in-memory weights only match if EarlyStopping
+    # actually stopped and restored them; calibrate on what the detector will load.
+    best_model = model
+    try:
+        best_model = tf.keras.models.load_model(staged_model_path, compile=False)
+    except Exception as e:
+        logger.warning(f"Could not reload best LSTM checkpoint from {staged_model_path} ({e}); calibrating on the final weights.")
 
-    logger.info(f"✅ LSTM model training complete. Best model saved to: {model_save_path}")
-    return model, history # Return model and history
+    # Calibrate the detector once here instead of taking a percentile of every request's batch
+    _, X_val = split_train_val(X_seq)
+    threshold = float(np.percentile(sequence_mse(best_model, X_val), config.DETECTOR_DYNAMIC_THRESHOLD_PERCENTILE))
+    try:
+        joblib.dump(threshold, staged_threshold_path)
+        logger.info(f"✅ LSTM MSE threshold {threshold:.6f} ({config.DETECTOR_DYNAMIC_THRESHOLD_PERCENTILE}th percentile of validation MSE) saved to: {staged_threshold_path}")
+    except Exception as e:
+        logger.error(f"Error saving LSTM MSE threshold: {e}")
+    # Same weights as the checkpoint, so the CPU TFLite path and the Keras path agree with the threshold
+    export_tflite(best_model, tflite_path(staged_model_path))
+    _publish_model_files(model_save_path, threshold_save_path)
+    return best_model, history # Return the best (saved) model and history
+
+def _staging_path(path):
+    """Sibling of `path` that train_lstm writes to before _publish_model_files() moves it into place."""
+    base, ext = os.path.splitext(path)
+    return f"{base}.staging{ext}"
+
+def _publish_model_files(model_path, threshold_path):
+    """
+    Renames a training run's staged threshold, TFLite copy and model over the live files, model last, so a
+    running LSTMDETector never pairs the new weights with the previous run's threshold or TFLite model.
+    Where the run produced no threshold or TFLite file, the previous model's one is removed instead.
+    """
+    staged_model_path = _staging_path(model_path)
+    if not os.path.exists(staged_model_path):
+        logger.error(f"No staged LSTM model at {staged_model_path}; keeping the current model files.")
+        return False
+    for staged, live in ((_staging_path(threshold_path), threshold_path),
+                         (tflite_path(staged_model_path), tflite_path(model_path))):
+        if os.path.exists(staged):
+            os.replace(staged, live)
+        elif os.path.exists(live):
+            os.remove(live)
+    os.replace(staged_model_path, model_path)
+    logger.info(f"✅ LSTM model, threshold and TFLite copy published to: {model_path}")
+    return True
+
+def tflite_path(model_path):
+    """Where the INT8 TFLite copy of a Keras LSTM model is stored."""
+    return model_path + ".tflite"
+
+def export_tflite(model, save_path):
+    """
+    Post-training dynamic-range quantization: INT8 weights, 4x smaller, with int8 matmul kernels on CPU.
+    Used by LSTMDETector on hosts without a GPU.
+    """
+    try:
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        with open(save_path, 'wb') as f:
+            f.write(converter.convert())
+        logger.info(f"✅ INT8 TFLite LSTM model saved to: {save_path}")
+    except Exception as e: # Conversion support varies by TF version; the Keras model still works
+        logger.warning(f"Could not export TFLite LSTM model: {e}")
+
+def _reconstruction_mse(model, x):
+    """Reconstruction MSE per sequence, computed on-device so only an (N,) vector comes back."""
+    x = tf.cast(x, tf.float32)
+    # Mixed-precision models (see setup_gpu) take float16 in; the error and mean stay float32
+    compute_dtype = getattr(model, "compute_dtype", None) or tf.float32
+    reconstructions = tf.cast(model(tf.cast(x, compute_dtype), training=False), tf.float32)
+    return tf.reduce_mean(tf.square(x - reconstructions), axis=[1, 2])
+
+_mse_fn = tf.function(_reconstruction_mse, reduce_retracing=True)
+
+def concrete_mse_fn(model, timesteps, num_features, jit_compile=False):
+    """
+    _reconstruction_mse traced once for a fixed [batch, timesteps, features] float32 signature.
+    Calling the concrete function skips tf.function's per-call argument matching and retracing.
+    With jit_compile=True the graph is XLA-compiled on its first call for each batch size.
+    """
+    spec = tf.TensorSpec([None, timesteps, num_features], tf.float32)
+    return tf.function(lambda x: _reconstruction_mse(model, x), jit_compile=jit_compile).get_concrete_function(spec)
+
+def inference_mse_fn(model, timesteps, num_features):
+    """
+    XLA-compiled concrete_mse_fn(), warmed up once so the compile doesn't land on the first request.
+    Falls back to the plain graph if XLA rejects the model.
+    """
+    try:
+        mse_fn = concrete_mse_fn(model, timesteps, num_features, jit_compile=True)
+        mse_fn(tf.zeros([1, timesteps, num_features], tf.float32))
+        return mse_fn
+    except tf.errors.InvalidArgumentError as e:
+        logger.warning(f"XLA compilation of the LSTM MSE graph failed ({e}); using it without jit_compile.")
+        return concrete_mse_fn(model, timesteps, num_features)
+
+def sequence_mse(model, X_seq, batch_size=256, mse_fn=None):
+    """
+    Per-sequence MSE over X_seq in batches (slices of the window view, so nothing is copied up front).
+    `mse_fn` is an optional concrete_mse_fn() / inference_mse_fn() for this model.
+    """
+    if mse_fn is None:
+        batches = (_mse_fn(model, X_seq[start:start + batch_size]) for start in range(0, len(X_seq), batch_size))
+    else:
+        batches = (mse_fn(tf.constant(X_seq[start:start + batch_size], dtype=tf.float32))
+                   for start in range(0, len(X_seq), batch_size))
+    return tf.concat(list(batches), axis=0).numpy()
 
 def evaluate_lstm_mse(model, X_test_seq):
     logger.info("Evaluating LSTM model (calculating MSE)...")
-    preds = model.predict(X_test_seq)
     # Calculate MSE across timesteps and features for each sequence
-    mse_per_sequence = np.mean(np.square(X_test_seq - preds), axis=(1,2))
+    mse_per_sequence = sequence_mse(model, X_test_seq)
     logger.info(f"LSTM MSE mean on test data: {np.mean(mse_per_sequence):.6f}")
     return mse_per_sequence
 
@@ -183,7 +551,8 @@ def main():
         logger.info(f"\n🚀 Processing LSTM training data from: {config.LSTM_TRAIN_FILE}")
         # Specify label column if known, e.g., label_column_name='Label' for UNSW-NB15
         # For this example, we'll try to auto-detect it.
-        X_train_scaled, scaler = load_and_preprocess_dataset(config.LSTM_TRAIN_FILE, label_column_name=None)
+        # Later runs read only the numeric columns from the Parquet copy instead of re-parsing the CSV
+        X_train_scaled, scaler = load_and_preprocess_dataset(_prefer_parquet(config.LSTM_TRAIN_FILE), label_column_name=None)
 
         if X_train_scaled is None or scaler is None:
             logger.error("Failed to load or preprocess training data. Cannot train LSTM model.")
@@ -239,7 +608,7 @@ def main():
                 return
 
         # Preprocess test data using the (fit on train or loaded) scaler
-        X_test_scaled, _ = load_and_preprocess_dataset(config.LSTM_TEST_FILE, scaler_to_use=scaler, label_column_name=None)
+        X_test_scaled, _ = load_and_preprocess_dataset(_prefer_parquet(config.LSTM_TEST_FILE), scaler_to_use=scaler, label_column_name=None)
 
         if X_test_scaled is None:
             logger.error("Failed to load or preprocess test data. Skipping LSTM evaluation.")
@@ -255,14 +624,22 @@ def main():
 
 class LSTMDETector:
     def __init__(self, model_path=config.LSTM_MODEL_PATH, scaler_path=config.LSTM_SCALER_PATH,
-                 timesteps=TIMESTEPS, threshold_percentile=None):
+                 timesteps=TIMESTEPS, threshold_percentile=None, threshold_path=config.LSTM_THRESHOLD_PATH):
         self.model_path = model_path
         self.scaler_path = scaler_path
+        self.threshold_path = threshold_path
         self.timesteps = timesteps
         self.model = None
         self.scaler = None
+        self._scale = None # MinMaxScaler scale_/min_ as float32, applied directly in predict()
+        self._min = None
+        self._mse_infer = None # inference_mse_fn() for the loaded model, traced and compiled at load time
+        self._interp = None # TFLite interpreter for the INT8 model on CPU-only hosts
+        self._interp_lock = threading.Lock() # Interpreters are not thread-safe; predict() runs in a threadpool
         self.threshold = None # Actual MSE value threshold
         self.model_last_loaded_time = 0
+        self._model_dirty = False # Set by the watchdog observer when the model, threshold or TFLite file changes
+        self._observer = self._start_model_watch()
         self._load_model_and_scaler()
 
         if threshold_percentile is not None:
@@ -271,14 +648,57 @@ class LSTMDETector:
             self.threshold_percentile_dynamic = threshold_percentile
         else:
             self.threshold_percentile_dynamic = config.DETECTOR_DYNAMIC_THRESHOLD_PERCENTILE
-            logger.info(f"LSTM Detector: Defaulting to dynamic threshold calculation at {self.threshold_percentile_dynamic}th percentile if not set otherwise.")
+            if self.threshold is None:
+                logger.info(f"LSTM Detector: No stored MSE threshold; falling back to dynamic calculation at {self.threshold_percentile_dynamic}th percentile.")
+
+    def _watched_paths(self):
+        """Files a reload reads that train_lstm publishes: the model, its threshold and its TFLite copy."""
+        return (self.model_path, self.threshold_path, tflite_path(self.model_path))
+
+    def _newest_mtime(self):
+        """Latest modification time among the existing watched files (raises OSError if there are none)."""
+        mtimes = [os.path.getmtime(path) for path in self._watched_paths() if os.path.exists(path)]
+        if not mtimes:
+            raise OSError(f"None of {self._watched_paths()} exist")
+        return max(mtimes)
+
+    def _start_model_watch(self):
+        """Watches the model's directory so predict() only reads a flag; returns None if unavailable."""
+        if Observer is None:
+            return None
+        model_path = os.path.abspath(self.model_path)
+        watched = {os.path.abspath(path) for path in self._watched_paths()}
+        detector = self
+
+        class _ModelFileHandler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                # Covers in-place writes as well as save-to-temp-then-rename
+                if watched & {os.path.abspath(event.src_path), os.path.abspath(getattr(event, "dest_path", "") or "")}:
+                    detector._model_dirty = True
+
+        try:
+            observer = Observer()
+            observer.daemon = True
+            observer.schedule(_ModelFileHandler(), os.path.dirname(model_path), recursive=False)
+            observer.start()
+            logger.info(f"LSTM Detector: Watching {model_path} for changes.")
+            return observer
+        except Exception as e: # Missing directory, inotify limits, ...
+            logger.warning(f"LSTM Detector: Could not watch {model_path} ({e}); falling back to mtime polling.")
+            return None
 
     def _check_and_reload_model(self):
         """Checks if the model file has been updated and reloads it if so."""
+        if self._observer is not None:
+            if self._model_dirty:
+                self._model_dirty = False
+                logger.info("LSTM Detector: Model, threshold or TFLite file has changed. Reloading...")
+                self._load_model_and_scaler()
+            return
         try:
-            current_mod_time = os.path.getmtime(self.model_path)
+            current_mod_time = self._newest_mtime()
             if current_mod_time > self.model_last_loaded_time:
-                logger.info("LSTM Detector: Model file has changed. Reloading...")
+                logger.info("LSTM Detector: Model, threshold or TFLite file has changed. Reloading...")
                 self._load_model_and_scaler()
         except OSError:
             logger.debug(f"LSTM Detector: Could not check modification time for {self.model_path}.")
@@ -291,14 +711,67 @@ class LSTMDETector:
         try:
             self.model = tf.keras.models.load_model(self.model_path)
             self.scaler = joblib.load(self.scaler_path)
-            self.model_last_loaded_time = os.path.getmtime(self.model_path)
+            if hasattr(self.scaler, "scale_") and hasattr(self.scaler, "min_"): # MinMaxScaler: X * scale_ + min_
+                self._scale = self.scaler.scale_.astype(np.float32)
+                self._min = self.scaler.min_.astype(np.float32)
+            else:
+                self._scale = self._min = None
+            self._interp = self._load_tflite()
+            num_features = getattr(self.scaler, "n_features_in_", None)
+            if self._interp is None and num_features:
+                self._mse_infer = inference_mse_fn(self.model, self.timesteps, num_features)
+            else:
+                self._mse_infer = None
+            self.model_last_loaded_time = self._newest_mtime()
             logger.info(f"LSTM Detector: Model and scaler loaded successfully from {self.model_path} and {self.scaler_path}")
-            # Potentially load a pre-calculated MSE threshold here too
-            # e.g., self.threshold = joblib.load(os.path.join(config.MODELS_DIR, "lstm_mse_threshold.pkl"))
+            if os.path.exists(self.threshold_path): # Written by train_lstm alongside the model
+                self.threshold = float(joblib.load(self.threshold_path))
+                logger.info(f"LSTM Detector: Fixed MSE threshold {self.threshold:.6f} loaded from {self.threshold_path}")
+            else:
+                self.threshold = None # A previous model's threshold doesn't apply to this one
+                logger.info(f"LSTM Detector: No MSE threshold at {self.threshold_path}; using dynamic calculation.")
         except Exception as e:
             logger.error(f"LSTM Detector: Error loading model, scaler, or threshold: {e}")
             self.model = None
             self.scaler = None
+            self._scale = self._min = None
+            self._mse_infer = None
+            self._interp = None
+
+    def _load_tflite(self):
+        """Loads the INT8 TFLite model on CPU-only hosts if it is at least as new as the Keras model."""
+        path = tflite_path(self.model_path)
+        if tf.config.list_physical_devices('GPU') or not os.path.exists(path):
+            return None
+        if os.path.getmtime(path) < os.path.getmtime(self.model_path):
+            logger.warning(f"LSTM Detector: {path} is older than the Keras model; ignoring it.")
+            return None
+        try:
+            interp = tf.lite.Interpreter(model_path=path, num_threads=os.cpu_count())
+            interp.allocate_tensors()
+            logger.info(f"LSTM Detector: Using INT8 TFLite model {path} for CPU inference.")
+            return interp
+        except Exception as e:
+            logger.warning(f"LSTM Detector: Could not load TFLite model {path} ({e}); using the Keras model.")
+            return None
+
+    def _tflite_mse(self, X_seq, batch_size=256):
+        """Per-sequence reconstruction MSE through the TFLite interpreter, resizing its input only when the batch shape changes."""
+        interp = self._interp
+        input_index = interp.get_input_details()[0]['index']
+        output_index = interp.get_output_details()[0]['index']
+        mse = np.empty(len(X_seq), dtype=np.float32)
+        with self._interp_lock:
+            for start in range(0, len(X_seq), batch_size):
+                batch = np.ascontiguousarray(X_seq[start:start + batch_size], dtype=np.float32)
+                if tuple(interp.get_input_details()[0]['shape']) != batch.shape:
+                    interp.resize_tensor_input(input_index, batch.shape)
+                    interp.allocate_tensors()
+                interp.set_tensor(input_index, batch)
+                interp.invoke()
+                reconstructions = interp.get_tensor(output_index)
+                mse[start:start + len(batch)] = np.mean(np.square(batch - reconstructions), axis=(1, 2))
+        return mse
 
     def set_mse_threshold(self, threshold_value):
         """Allows setting a pre-calculated MSE threshold."""
@@ -327,8 +800,15 @@ class LSTMDETector:
             return {"verdict": "error", "score": 0.0, "explanation": "Input data is empty.", "model_type": "LSTM"}
 
         try:
-            X_values = data_df_numeric.values
-            X_scaled = self.scaler.transform(X_values)
+            X_values = data_df_numeric.to_numpy(dtype=np.float32)
+            if self._scale is not None:
+                # Same result as scaler.transform, without sklearn's per-call validation or the float64 upcast
+                if X_values.shape[1] != self._scale.shape[0]:
+                    raise ValueError(f"X has {X_values.shape[1]} features, but the scaler expects {self._scale.shape[0]}.")
+                X_scaled = X_values * self._scale
+                X_scaled += self._min
+            else:
+                X_scaled = self.scaler.transform(X_values)
         except Exception as e:
             logger.error(f"LSTM Detector: Error scaling input data: {e}")
             return {"verdict": "error", "score": 0.0, "explanation": f"Error scaling input data: {e}", "model_type": "LSTM"}
@@ -339,8 +819,10 @@ class LSTMDETector:
             return {"verdict": "error", "score": 0.0, "explanation": "Not enough data for sequences or reshaping error.", "model_type": "LSTM"}
 
         try:
-            reconstructions = self.model.predict(X_seq)
-            mse_per_sequence = np.mean(np.square(X_seq - reconstructions), axis=(1,2))
+            if self._interp is not None:
+                mse_per_sequence = self._tflite_mse(X_seq)
+            else:
+                mse_per_sequence = sequence_mse(self.model, X_seq, mse_fn=self._mse_infer)
             avg_mse = np.mean(mse_per_sequence)
 
             current_threshold = self.threshold
@@ -1,6 +1,13 @@
 import os
 import json
-import glob # For finding files
+import sqlite3
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import orjson # Faster parsing of feedback records; optional
+    _loads = orjson.loads # Raises orjson.JSONDecodeError, a json.JSONDecodeError subclass
+except ImportError:
+    _loads = json.loads
 
 import config # For logger
 
@@ -8,17 +15,48 @@ logger = config.get_logger(__name__)
 
 # Directory where feedback logs are stored (consistent with feedback_logger.py)
 FEEDBACK_LOGS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "feedback_logs")
+FEEDBACK_READ_WORKERS = 16 # Threads for reading legacy per-incident feedback files
 # Directory to potentially store processed retraining data (optional for this phase)
 # RETRAINING_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "retraining_data")
 
 
-def collect_feedback_for_retraining(processed_feedback_file_tracker="feedback_logs/.processed_feedback.txt"):
+def _record_processed(conn, entries):
+    """Stores tracker entries ("name" or "name@byte_offset"); JSONL offsets only ever move forward."""
+    rows = [(name, int(offset)) for name, offset in (e.rsplit('@', 1) for e in entries if '@' in e)]
+    rows += [(e, None) for e in entries if '@' not in e]
+    with conn:
+        conn.executemany('''
+            INSERT INTO processed (name, offset) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET offset = excluded.offset
+            WHERE excluded.offset > processed.offset
+        ''', rows)
+
+def _open_tracker(tracker_path):
+    """
+    Opens the SQLite processed-feedback tracker, creating it if needed.
+    A legacy line-based .txt tracker next to it is imported once so nothing is reprocessed.
+    """
+    conn = sqlite3.connect(tracker_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # offset is the byte position read up to for JSONL files, NULL for legacy per-incident files
+    conn.execute("CREATE TABLE IF NOT EXISTS processed (name TEXT PRIMARY KEY, offset INTEGER)")
+    legacy_tracker = os.path.splitext(tracker_path)[0] + ".txt"
+    if os.path.exists(legacy_tracker) and conn.execute("SELECT 1 FROM processed LIMIT 1").fetchone() is None:
+        with open(legacy_tracker, 'r') as f_tracker:
+            entries = [line.strip() for line in f_tracker if line.strip()]
+        _record_processed(conn, entries)
+        logger.info(f"Imported {len(entries)} entries from legacy tracker {legacy_tracker}.")
+    return conn
+
+def collect_feedback_for_retraining(processed_feedback_file_tracker="feedback_logs/.processed_feedback.db"):
     """
-    Scans the feedback_logs directory for new feedback files, parses them,
+    Scans the feedback_logs directory for new feedback records (daily JSONL files and
+    legacy per-incident JSON files), parses them,
     and collects the data for potential retraining.
 
     Args:
-        processed_feedback_file_tracker (str): Path to a file that lists already processed feedback files.
+        processed_feedback_file_tracker (str): Path to a SQLite file recording already processed feedback files
+                                              (and, for JSONL files, how far they have been read).
                                               This helps avoid reprocessing the same feedback.
     Returns:
         list: A list of dictionaries, where each dictionary contains the parsed content
@@ -29,10 +67,14 @@ def collect_feedback_for_retraining(processed_feedback_file_tracker="feedback_lo
         return []
 
     processed_files = set()
+    jsonl_offsets = {} # JSONL files are appended to over time, so the tracker keeps a byte offset for them
     try:
-        if os.path.exists(processed_feedback_file_tracker):
-            with open(processed_feedback_file_tracker, 'r') as f_tracker:
-                processed_files = set(line.strip() for line in f_tracker)
+        with closing(_open_tracker(processed_feedback_file_tracker)) as conn:
+            for name, offset in conn.execute("SELECT name, offset FROM processed"):
+                if offset is None:
+                    processed_files.add(name)
+                else:
+                    jsonl_offsets[name] = offset
         logger.info(f"Loaded {len(processed_files)} previously processed feedback file names.")
     except Exception as e:
         logger.error(f"Error reading processed feedback tracker file {processed_feedback_file_tracker}: {e}")
@@ -41,43 +83,80 @@ def collect_feedback_for_retraining(processed_feedback_file_tracker="feedback_lo
     collected_feedback_data = []
     newly_processed_files = []
 
-    # Find all JSON files in the feedback logs directory
-    feedback_files = glob.glob(os.path.join(FEEDBACK_LOGS_DIR, "feedback_*.json"))
-    logger.info(f"Found {len(feedback_files)} total feedback files in {FEEDBACK_LOGS_DIR}.")
-
-    for filepath in feedback_files:
+    def _is_valid(feedback_content, source):
+        # Basic validation of content (can be expanded)
+        if not all(k in feedback_content for k in ['incident_identifier', 'original_features', 'user_feedback']):
+            logger.warning(f"Skipping record from {source}: Missing one or more required keys "
+                           f"('incident_identifier', 'original_features', 'user_feedback').")
+            return False
+        return True
+
+    # One directory pass for both formats; DirEntry.is_file() uses the type readdir already returned
+    jsonl_files, feedback_files = [], []
+    with os.scandir(FEEDBACK_LOGS_DIR) as entries:
+        for entry in entries:
+            if entry.name.startswith('feedback_') and entry.is_file():
+                if entry.name.endswith('.jsonl'):
+                    jsonl_files.append(entry.path)
+                elif entry.name.endswith('.json'):
+                    feedback_files.append(entry.path)
+
+    # Daily append-only JSONL files written by feedback_logger.py
+    for filepath in sorted(jsonl_files):
         filename = os.path.basename(filepath)
-        if filename in processed_files:
-            # logger.debug(f"Skipping already processed feedback file: {filename}")
-            continue
-
-        logger.info(f"Processing new feedback file: {filename}")
+        offset = jsonl_offsets.get(filename, 0)
         try:
-            with open(filepath, 'r') as f:
-                feedback_content = json.load(f)
+            with open(filepath, 'rb') as f:
+                f.seek(offset)
+                for raw_line in iter(f.readline, b''):
+                    if not raw_line.endswith(b'\n'):
+                        break # Record still being written; pick it up next run
+                    offset += len(raw_line)
+                    try:
+                        feedback_content = _loads(raw_line)
+                    except json.JSONDecodeError:
+                        logger.error(f"Error decoding JSON line in file: {filepath}. Skipping.")
+                        continue
+                    if _is_valid(feedback_content, filename):
+                        collected_feedback_data.append(feedback_content)
+        except Exception as e:
+            logger.error(f"Unexpected error processing file {filepath}: {e}", exc_info=True)
+        if offset != jsonl_offsets.get(filename, 0):
+            newly_processed_files.append(f"{filename}@{offset}")
 
-            # Basic validation of content (can be expanded)
-            if not all(k in feedback_content for k in ['incident_identifier', 'original_features', 'user_feedback']):
-                logger.warning(f"Skipping file {filename}: Missing one or more required keys "
-                               f"('incident_identifier', 'original_features', 'user_feedback').")
-                continue
+    # Legacy one-JSON-file-per-incident feedback
+    logger.info(f"Found {len(feedback_files)} legacy feedback files in {FEEDBACK_LOGS_DIR}.")
 
-            collected_feedback_data.append(feedback_content)
-            newly_processed_files.append(filename)
-            logger.debug(f"Successfully parsed and collected feedback from {filename}.")
+    new_files = [f for f in feedback_files if os.path.basename(f) not in processed_files]
 
+    def _parse_one(filepath):
+        filename = os.path.basename(filepath)
+        try:
+            with open(filepath, 'rb') as f: # Bytes straight to the parser, no text decode
+                feedback_content = _loads(f.read())
         except json.JSONDecodeError:
             logger.error(f"Error decoding JSON from file: {filepath}. Skipping.")
+            return filename, None
         except Exception as e:
             logger.error(f"Unexpected error processing file {filepath}: {e}", exc_info=True)
+            return filename, None
+        return filename, (feedback_content if _is_valid(feedback_content, filename) else None)
+
+    # Many small files: overlap the open/read syscalls across threads
+    if new_files:
+        with ThreadPoolExecutor(max_workers=min(FEEDBACK_READ_WORKERS, len(new_files))) as executor:
+            for filename, feedback_content in executor.map(_parse_one, new_files):
+                if feedback_content is not None:
+                    collected_feedback_data.append(feedback_content)
+                    newly_processed_files.append(filename)
+        logger.info(f"Parsed {len(new_files)} new legacy feedback file(s).")
 
     # Update the processed files tracker
     if newly_processed_files:
         try:
-            with open(processed_feedback_file_tracker, 'a') as f_tracker:
-                for fname in newly_processed_files:
-                    f_tracker.write(f"{fname}\n")
-            logger.info(f"Updated processed feedback tracker with {len(newly_processed_files)} new files.")
+            with closing(_open_tracker(processed_feedback_file_tracker)) as conn:
+                _record_processed(conn, newly_processed_files)
+            logger.info(f"Updated processed feedback tracker with {len(newly_processed_files)} new entries.")
         except Exception as e:
             logger.error(f"Error updating processed feedback tracker file {processed_feedback_file_tracker}: {e}")
 
@@ -180,7 +259,7 @@ if __name__ == '__main__':
          logger.info(f"Created dummy feedback file: {dummy_file_2_path}")
 
     # Optionally, reset the tracker file for a clean test run of collection
-    tracker_file = os.path.join(FEEDBACK_LOGS_DIR, ".processed_feedback.txt")
+    tracker_file = os.path.join(FEEDBACK_LOGS_DIR, ".processed_feedback.db")
     if os.path.exists(tracker_file):
         logger.info(f"Removing existing tracker file for clean test: {tracker_file}")
         os.remove(tracker_file)
@@ -0,0 +1,61 @@
+import os
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from web3 import Web3, AsyncHTTPProvider
+
+import config # For logger
+
+logger = config.get_logger(__name__)
+
+# urllib3's default pool keeps 10 sockets per host, which FastAPI request bursts easily exhaust.
+RPC_POOL_CONNECTIONS = int(os.getenv("ZERO_HACK_RPC_POOL_CONNECTIONS", "32"))
+RPC_POOL_MAXSIZE = int(os.getenv("ZERO_HACK_RPC_POOL_MAXSIZE", "64"))
+RPC_REQUEST_TIMEOUT_SECONDS = float(os.getenv("ZERO_HACK_RPC_TIMEOUT_SECONDS", "10"))
+
+_rpc_session: Optional[requests.Session] = None
+_http_providers: Dict[str, Web3.HTTPProvider] = {}
+_async_http_providers: Dict[str, AsyncHTTPProvider] = {}
+_lock = threading.RLock() # Re-entrant: get_http_provider() calls get_rpc_session() while holding it
+
+def get_rpc_session() -> requests.Session:
+    """Returns the process-wide keep-alive session shared by every JSON-RPC HTTP provider."""
+    global _rpc_session
+    if _rpc_session is None:
+        with _lock:
+            if _rpc_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=RPC_POOL_CONNECTIONS, pool_maxsize=RPC_POOL_MAXSIZE,
+                                      max_retries=Retry(total=3, backoff_factor=0.1))
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update({"Connection": "keep-alive"})
+                _rpc_session = session
+                logger.info(f"RPC session created (pool_connections={RPC_POOL_CONNECTIONS}, pool_maxsize={RPC_POOL_MAXSIZE}).")
+    return _rpc_session
+
+def get_http_provider(rpc_url: str) -> Web3.HTTPProvider:
+    """Returns one HTTPProvider per RPC URL per process, all backed by the shared session."""
+    provider = _http_providers.get(rpc_url)
+    if provider is None:
+        with _lock:
+            provider = _http_providers.get(rpc_url)
+            if provider is None:
+                provider = Web3.HTTPProvider(rpc_url, session=get_rpc_session(),
+                                             request_kwargs={"timeout": RPC_REQUEST_TIMEOUT_SECONDS})
+                _http_providers[rpc_url] = provider
+    return provider
+
+def get_async_http_provider(rpc_url: str) -> AsyncHTTPProvider:
+    """Async counterpart of get_http_provider: one AsyncHTTPProvider (and aiohttp session) per RPC URL."""
+    provider = _async_http_providers.get(rpc_url)
+    if provider is None:
+        with _lock:
+            provider = _async_http_providers.get(rpc_url)
+            if provider is None:
+                provider = AsyncHTTPProvider(rpc_url)
+                _async_http_providers[rpc_url] = provider
+    return provider
@@ -1,5 +1,14 @@
+import bisect
 import datetime
-from collections import defaultdict
+import hashlib
+import threading
+import time
+from collections import defaultdict, deque, OrderedDict
+import numpy as np
+
+import config
+
+logger = config.get_logger(__name__)
 
 # --- Configuration for Rules ---
 SSH_BRUTE_FORCE_PORT = 22
@@ -13,9 +22,152 @@ PORT_SCAN_WINDOW_SECONDS = 60           # Within 60 seconds
 DDOS_CONNECTION_THRESHOLD = 100 # More than 100 connections/packets from various sources
 DDOS_WINDOW_SECONDS = 10        # Within 10 seconds
 
+# Findings of the most recently analyzed distinct sessions, reused when the same events come in again
+SESSION_CACHE_SIZE = 128
+
+# ingest() reports an ongoing attack at most once per key (rule, source/destination) per cooldown of event time
+ALERT_COOLDOWN_SECONDS = 60
+# ingest() drops events stamped further than this ahead of the wall clock, so one bad timestamp can't stall the stream
+STREAM_MAX_FUTURE_SECONDS = 300
+
 
 # --- Rule Definitions & Logic ---
 
+_ONE_MICROSECOND = datetime.timedelta(microseconds=1)
+_EPOCH = datetime.datetime(1970, 1, 1)
+_EPOCH_UTC = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_WINDOW_US = 1_000_000 # Microseconds per configured window second
+# SignatureEngine drops idle per-key stream windows once per longest rule window of event time
+_STREAM_SWEEP_US = max(SSH_BRUTE_FORCE_WINDOW_SECONDS, PORT_SCAN_WINDOW_SECONDS, DDOS_WINDOW_SECONDS) * _WINDOW_US
+
+
+def _epoch_us(timestamp):
+    """
+    Integer microseconds since the epoch, computed once per event so the rules compare plain ints.
+    Naive datetimes are taken at face value (no local-time conversion), so differences match
+    datetime subtraction exactly. Numeric values are treated as POSIX seconds.
+    """
+    if isinstance(timestamp, datetime.datetime):
+        return (timestamp - (_EPOCH if timestamp.tzinfo is None else _EPOCH_UTC)) // _ONE_MICROSECOND
+    return round(float(timestamp) * 1_000_000)
+
+
+def _as_datetime(timestamp):
+    """Event timestamp for display in findings; numeric POSIX timestamps are only converted here."""
+    return timestamp if isinstance(timestamp, datetime.datetime) else datetime.datetime.fromtimestamp(timestamp)
+
+
+def _find_bursts(times_us, window_us, threshold):
+    """
+    Yields (start, end) slices (end exclusive) of sorted `times_us` holding at least `threshold`
+    events within `window_us` of their first one. Each slice covers every such event and is then
+    consumed, so later bursts don't overlap it.
+    """
+    n = len(times_us)
+    times = np.fromiter(times_us, dtype=np.int64, count=n)
+    ends = np.searchsorted(times, times + window_us, side='right')
+    end = 0
+    for start in np.flatnonzero(ends - np.arange(n) >= threshold):
+        if start >= end:
+            end = int(ends[start])
+            yield int(start), end
+
+
+def _find_distinct_bursts(times_us, keys, window_us, threshold):
+    """
+    Like _find_bursts, but counting distinct `keys` within the window. Distinct counts don't
+    reduce to searchsorted, so this is a two-pointer sweep keeping per-key counts.
+    """
+    n = len(times_us)
+    key_counts = defaultdict(int) # key -> occurrences in [left, right]
+    left = right = 0
+    while right < n:
+        while times_us[right] - times_us[left] > window_us:
+            key_counts[keys[left]] -= 1
+            if not key_counts[keys[left]]:
+                del key_counts[keys[left]]
+            left += 1
+        key_counts[keys[right]] += 1
+        if len(key_counts) >= threshold:
+            end = bisect.bisect_right(times_us, times_us[left] + window_us, right + 1) # Rest of the window
+            yield left, end
+            left = right = end
+            key_counts.clear()
+            continue
+        right += 1
+
+
+def _bucket_session(session_data):
+    """
+    Groups the session's events for every rule in a single pass, so each rule only
+    evaluates its own pre-built buckets instead of re-walking session_data.
+    SSH and DDoS groups come back sorted by time; port_scan['time_ordered'] tells whether its columns are.
+    """
+    attempts_by_ip_port = defaultdict(list) # SSH: (source_ip, ssh_port) -> [(t, timestamp)]
+    # Port scan: parallel columns, one entry per event, instead of nested dicts of per-event dicts.
+    # IPs are interned to ints in first-seen order; pair_ids number (source_ip, dest_ip) pairs.
+    source_ids, pair_ids = {}, {}
+    port_scan = {'pairs': [], 'src_id': [], 'pair_id': [], 'port': [], 't': [], 'timestamp': []}
+    events_by_dest_service = defaultdict(list) # DDoS: (dest_ip, dest_port) -> [{t, timestamp, source_ip}]
+    # Live sessions usually arrive in time order, and then every group is already sorted
+    time_ordered, last_t = True, None
+
+    for event in session_data:
+        source_ip = event.get('source_ip')
+        dest_ip = event.get('dest_ip')
+        dest_port = event.get('dest_port')
+        timestamp = event.get('timestamp')
+        if timestamp is None:
+            continue
+        try:
+            t = _epoch_us(timestamp)
+        except (TypeError, ValueError, OverflowError):
+            continue # Unusable timestamp, no rule can place it in a window
+        if last_t is not None and t < last_t:
+            time_ordered = False
+        last_t = t
+
+        if dest_port == SSH_BRUTE_FORCE_PORT and source_ip is not None:
+            # Could also check for SYN flags if available: and 'S' in event.get('flags', '')
+            attempts_by_ip_port[(source_ip, dest_port)].append((t, timestamp))
+
+        if not all([source_ip, dest_ip, dest_port, timestamp]):
+            continue # Skip events with missing critical info
+
+        pair_id = pair_ids.get((source_ip, dest_ip))
+        if pair_id is None:
+            pair_id = pair_ids[(source_ip, dest_ip)] = len(port_scan['pairs'])
+            port_scan['pairs'].append((source_ip, dest_ip))
+        port_scan['src_id'].append(source_ids.setdefault(source_ip, len(source_ids)))
+        port_scan['pair_id'].append(pair_id)
+        port_scan['port'].append(dest_port)
+        port_scan['t'].append(t)
+        port_scan['timestamp'].append(timestamp)
+        events_by_dest_service[(dest_ip, dest_port)].append({'t': t, 'timestamp': timestamp, 'source_ip': source_ip})
+
+    if not time_ordered:
+        for attempts in attempts_by_ip_port.values():
+            attempts.sort(key=lambda x: x[0])
+        for events in events_by_dest_service.values():
+            events.sort(key=lambda x: x['t'])
+    port_scan['time_ordered'] = time_ordered
+    return {'ssh': attempts_by_ip_port, 'port_scan': port_scan, 'ddos': events_by_dest_service}
+
+
+# Cheap necessary conditions per bucket: when one is False the rule cannot fire and is skipped
+def _ssh_may_fire(attempts_by_ip_port):
+    return any(len(attempts) >= SSH_BRUTE_FORCE_ATTEMPTS_THRESHOLD for attempts in attempts_by_ip_port.values())
+
+
+def _port_scan_may_fire(columns):
+    # No (source, dest) pair can see more distinct ports than the whole session does
+    return len(set(columns['port'])) >= PORT_SCAN_UNIQUE_PORTS_THRESHOLD
+
+
+def _ddos_may_fire(events_by_dest_service):
+    return any(len(events) >= DDOS_CONNECTION_THRESHOLD for events in events_by_dest_service.values())
+
+
 def check_ssh_brute_force(session_data):
     """
     Detects potential SSH brute-force attacks.
@@ -35,63 +187,46 @@ def check_ssh_brute_force(session_data):
               'explanation': 'description of the detected event',
               'details': {'source_ip': ip, 'port': port, 'attempts': count, 'window_seconds': seconds}
     """
+    return _evaluate_ssh_brute_force(_bucket_session(session_data)['ssh'])
+
+
+def _ssh_finding(source_ip, port, current_window_timestamps, actual_window_duration):
+    """SSH_BRUTE_FORCE finding for the attempts in one burst (datetimes, in time order)."""
+    attempts_in_window = len(current_window_timestamps)
+    return {
+        'is_match': True,
+        'confidence': 1.0,
+        'rule_id': 'SSH_BRUTE_FORCE',
+        'explanation': (
+            f"Potential SSH brute-force from {source_ip} to port {port}. "
+            f"{attempts_in_window} attempts observed "
+            f"between {current_window_timestamps[0]} and {current_window_timestamps[-1]} (Window: {actual_window_duration:.2f}s)."
+        ),
+        'details': {
+            'source_ip': source_ip,
+            'dest_port': port,
+            'attempt_timestamps': [ts.isoformat() for ts in current_window_timestamps],
+            'observed_attempts_in_burst': attempts_in_window,
+            'configured_threshold': SSH_BRUTE_FORCE_ATTEMPTS_THRESHOLD,
+            'configured_window_seconds': SSH_BRUTE_FORCE_WINDOW_SECONDS
+        }
+    }
+
+
+def _evaluate_ssh_brute_force(attempts_by_ip_port):
+    """Burst detection over {(source_ip, port): [(t, timestamp)]} built by _bucket_session()."""
     findings = []
-    # Group attempts by source_ip and ssh_port
-    attempts_by_ip_port = defaultdict(list)
-
-    for event in session_data:
-        if event.get('dest_port') == SSH_BRUTE_FORCE_PORT:
-            # Could also check for SYN flags if available: and 'S' in event.get('flags', '')
-            attempts_by_ip_port[(event['source_ip'], event['dest_port'])].append(event['timestamp'])
-
-    for (source_ip, port), timestamps in attempts_by_ip_port.items():
-        if len(timestamps) < SSH_BRUTE_FORCE_ATTEMPTS_THRESHOLD: # Not enough attempts to trigger
+    for (source_ip, port), attempts in attempts_by_ip_port.items():
+        if len(attempts) < SSH_BRUTE_FORCE_ATTEMPTS_THRESHOLD: # Not enough attempts to trigger
             continue
 
-        timestamps.sort()
-
-        # Check for attempts within the defined window
-        # Iterate through timestamps to find if a burst of attempts occurred
-        for i in range(len(timestamps) - SSH_BRUTE_FORCE_ATTEMPTS_THRESHOLD + 1):
-            window_start_time = timestamps[i]
-            window_end_time_potential = window_start_time + datetime.timedelta(seconds=SSH_BRUTE_FORCE_WINDOW_SECONDS)
-
-            attempts_in_window = 0
-            # Count attempts from index i that fall within this specific window
-            current_window_timestamps = []
-            for j in range(i, len(timestamps)):
-                if timestamps[j] <= window_end_time_potential:
-                    attempts_in_window += 1
-                    current_window_timestamps.append(timestamps[j])
-                else:
-                    # Timestamps are sorted, so no need to check further for this window_start_time
-                    break
-
-            if attempts_in_window >= SSH_BRUTE_FORCE_ATTEMPTS_THRESHOLD:
-                actual_window_duration = (current_window_timestamps[-1] - current_window_timestamps[0]).total_seconds()
-                findings.append({
-                    'is_match': True,
-                    'confidence': 1.0,
-                    'rule_id': 'SSH_BRUTE_FORCE',
-                    'explanation': (
-                        f"Potential SSH brute-force from {source_ip} to port {port}. "
-                        f"{attempts_in_window} attempts observed "
-                        f"between {current_window_timestamps[0]} and {current_window_timestamps[-1]} (Window: {actual_window_duration:.2f}s)."
-                    ),
-                    'details': {
-                        'source_ip': source_ip,
-                        'dest_port': port,
-                        'attempt_timestamps': [ts.isoformat() for ts in current_window_timestamps],
-                        'observed_attempts_in_burst': attempts_in_window,
-                        'configured_threshold': SSH_BRUTE_FORCE_ATTEMPTS_THRESHOLD,
-                        'configured_window_seconds': SSH_BRUTE_FORCE_WINDOW_SECONDS
-                    }
-                })
-                # To avoid multiple alerts for the same burst from this IP, we could break or mark these timestamps as processed.
-                # For simplicity now, it might report overlapping windows.
-                # A more advanced implementation would consume timestamps once they contribute to a finding.
-                break # Found a burst for this IP, move to next IP/port combo or refine to find all bursts.
+        times_us = [t for t, _ in attempts]
 
+        for start, end in _find_bursts(times_us, SSH_BRUTE_FORCE_WINDOW_SECONDS * _WINDOW_US,
+                                       SSH_BRUTE_FORCE_ATTEMPTS_THRESHOLD):
+            current_window_timestamps = [_as_datetime(ts) for _, ts in attempts[start:end]]
+            actual_window_duration = (times_us[end - 1] - times_us[start]) / _WINDOW_US
+            findings.append(_ssh_finding(source_ip, port, current_window_timestamps, actual_window_duration))
 
     return findings
 
@@ -110,68 +245,63 @@ def check_port_scan(session_data):
     Returns:
         list: A list of findings.
     """
+    return _evaluate_port_scan(_bucket_session(session_data)['port_scan'])
+
+
+def _port_scan_finding(source_ip, dest_ip, ports_in_window, timestamps_in_window, actual_window_duration):
+    """PORT_SCAN finding for one window: the set of ports hit and the event datetimes, in time order."""
+    return {
+        'is_match': True,
+        'confidence': 1.0,
+        'rule_id': 'PORT_SCAN',
+        'explanation': (
+            f"Potential port scan from {source_ip} to {dest_ip}. "
+            f"{len(ports_in_window)} unique ports targeted "
+            f"between {timestamps_in_window[0]} and {timestamps_in_window[-1]} (Window: {actual_window_duration:.2f}s)."
+        ),
+        'details': {
+            'source_ip': source_ip,
+            'destination_ip': dest_ip,
+            'targeted_ports': sorted(list(ports_in_window)),
+            'event_count_in_window': len(timestamps_in_window),
+            'unique_ports_in_window': len(ports_in_window),
+            'configured_threshold': PORT_SCAN_UNIQUE_PORTS_THRESHOLD,
+            'configured_window_seconds': PORT_SCAN_WINDOW_SECONDS
+        }
+    }
+
+
+def _evaluate_port_scan(columns):
+    """Scan detection over the port-scan columns built by _bucket_session()."""
     findings = []
-    # Group attempts by source_ip -> dest_ip
-    attempts_by_source_to_dest = defaultdict(lambda: defaultdict(list))
-
-    for event in session_data:
-        source_ip = event.get('source_ip')
-        dest_ip = event.get('dest_ip')
-        dest_port = event.get('dest_port')
-        timestamp = event.get('timestamp')
-
-        if not all([source_ip, dest_ip, dest_port, timestamp]):
-            continue # Skip events with missing critical info
-
-        attempts_by_source_to_dest[source_ip][dest_ip].append({'port': dest_port, 'timestamp': timestamp})
-
-    for source_ip, dest_targets in attempts_by_source_to_dest.items():
-        for dest_ip, events in dest_targets.items():
-            if len(events) < PORT_SCAN_UNIQUE_PORTS_THRESHOLD: # Not enough unique port attempts to be suspicious yet
-                continue
-
-            # Sort events by timestamp to analyze windows
-            events.sort(key=lambda x: x['timestamp'])
-
-            # Iterate through events to find a window with enough unique port scans
-            for i in range(len(events)):
-                window_start_time = events[i]['timestamp']
-                window_end_time_potential = window_start_time + datetime.timedelta(seconds=PORT_SCAN_WINDOW_SECONDS)
-
-                ports_in_window = set()
-                timestamps_in_window = []
-
-                for j in range(i, len(events)):
-                    event_ts = events[j]['timestamp']
-                    if event_ts <= window_end_time_potential:
-                        ports_in_window.add(events[j]['port'])
-                        timestamps_in_window.append(event_ts)
-                    else:
-                        break # Past the current time window
-
-                if len(ports_in_window) >= PORT_SCAN_UNIQUE_PORTS_THRESHOLD:
-                    actual_window_duration = (timestamps_in_window[-1] - timestamps_in_window[0]).total_seconds()
-                    findings.append({
-                        'is_match': True,
-                        'confidence': 1.0,
-                        'rule_id': 'PORT_SCAN',
-                        'explanation': (
-                            f"Potential port scan from {source_ip} to {dest_ip}. "
-                            f"{len(ports_in_window)} unique ports targeted "
-                            f"between {timestamps_in_window[0]} and {timestamps_in_window[-1]} (Window: {actual_window_duration:.2f}s)."
-                        ),
-                        'details': {
-                            'source_ip': source_ip,
-                            'destination_ip': dest_ip,
-                            'targeted_ports': sorted(list(ports_in_window)),
-                            'event_count_in_window': len(timestamps_in_window),
-                            'unique_ports_in_window': len(ports_in_window),
-                            'configured_threshold': PORT_SCAN_UNIQUE_PORTS_THRESHOLD,
-                            'configured_window_seconds': PORT_SCAN_WINDOW_SECONDS
-                        }
-                    })
-                    # Similar to brute force, decide if to break or find all scan windows
-                    break # Found a scan from this source to this dest, move on.
+    n = len(columns['t'])
+    if n < PORT_SCAN_UNIQUE_PORTS_THRESHOLD:
+        return findings
+
+    # Stable sort by (source, pair, time): each (source_ip, dest_ip) group becomes one contiguous
+    # time-ordered slice, with groups in the order the nested per-source dicts used to yield them.
+    # Time-ordered columns keep that order within a group under a stable sort, so time is dropped as a key.
+    times = np.array(columns['t'], dtype=np.int64)
+    pair_ids = np.array(columns['pair_id'], dtype=np.int64)
+    keys = (pair_ids, np.array(columns['src_id'], dtype=np.int64))
+    order = np.lexsort(keys if columns['time_ordered'] else (times,) + keys)
+    pair_sorted, times_sorted = pair_ids[order], times[order]
+    order = order.tolist()
+    ports_sorted = [columns['port'][k] for k in order]
+    bounds = (np.flatnonzero(np.diff(pair_sorted)) + 1).tolist()
+
+    for group_start, group_end in zip([0] + bounds, bounds + [n]):
+        if group_end - group_start < PORT_SCAN_UNIQUE_PORTS_THRESHOLD: # Not enough unique port attempts to be suspicious yet
+            continue
+        source_ip, dest_ip = columns['pairs'][int(pair_sorted[group_start])]
+        times_us = times_sorted[group_start:group_end].tolist()
+        ports = ports_sorted[group_start:group_end]
+        for start, end in _find_distinct_bursts(times_us, ports, PORT_SCAN_WINDOW_SECONDS * _WINDOW_US,
+                                                PORT_SCAN_UNIQUE_PORTS_THRESHOLD):
+            ports_in_window = set(ports[start:end])
+            timestamps_in_window = [_as_datetime(columns['timestamp'][k]) for k in order[group_start + start:group_start + end]]
+            actual_window_duration = (times_us[end - 1] - times_us[start]) / _WINDOW_US
+            findings.append(_port_scan_finding(source_ip, dest_ip, ports_in_window, timestamps_in_window, actual_window_duration))
     return findings
 
 
@@ -187,83 +317,84 @@ def check_ddos_flood(session_data):
     Returns:
         list: A list of findings.
     """
+    return _evaluate_ddos_flood(_bucket_session(session_data)['ddos'])
+
+
+def _ddos_finding(dest_ip, dest_port, event_count, sources_in_window, first_event_time, last_event_time, actual_window_duration):
+    """DDOS_FLOOD_DETECTED finding for one window of `event_count` events from `sources_in_window`."""
+    return {
+        'is_match': True,
+        'confidence': 1.0, # High for signature match
+        'rule_id': 'DDOS_FLOOD_DETECTED',
+        'explanation': (
+            f"Potential DDoS/Flood attack targeting {dest_ip}:{dest_port}. "
+            f"{event_count} connections/packets from {len(sources_in_window)} unique sources "
+            f"observed between {first_event_time} and {last_event_time} (Window: {actual_window_duration:.2f}s)."
+        ),
+        'details': {
+            'destination_ip': dest_ip,
+            'destination_port': dest_port,
+            'event_count_in_window': event_count,
+            'unique_source_ips_in_window': len(sources_in_window),
+            'configured_threshold': DDOS_CONNECTION_THRESHOLD,
+            'configured_window_seconds': DDOS_WINDOW_SECONDS,
+            'first_event_time': first_event_time.isoformat(),
+            'last_event_time': last_event_time.isoformat()
+        }
+    }
+
+
+def _evaluate_ddos_flood(events_by_dest_service):
+    """Flood detection over {(dest_ip, dest_port): [{'t', 'timestamp', 'source_ip'}]} built by _bucket_session()."""
     findings = []
-    # Group events by destination_ip and destination_port
-    events_by_dest_service = defaultdict(list)
-
-    for event in session_data:
-        dest_ip = event.get('dest_ip')
-        dest_port = event.get('dest_port')
-        timestamp = event.get('timestamp')
-        source_ip = event.get('source_ip') # Keep source_ip for diversity check
-
-        if not all([dest_ip, dest_port, timestamp, source_ip]):
-            continue
-
-        events_by_dest_service[(dest_ip, dest_port)].append({'timestamp': timestamp, 'source_ip': source_ip})
-
     for (dest_ip, dest_port), events in events_by_dest_service.items():
         if len(events) < DDOS_CONNECTION_THRESHOLD: # Not enough events to be considered a flood
             continue
 
-        events.sort(key=lambda x: x['timestamp'])
-
-        # Check for a high volume of events within the defined window
-        for i in range(len(events)):
-            window_start_time = events[i]['timestamp']
-            window_end_time_potential = window_start_time + datetime.timedelta(seconds=DDOS_WINDOW_SECONDS)
-
-            events_in_window = []
-            sources_in_window = set()
-
-            for j in range(i, len(events)):
-                event_ts = events[j]['timestamp']
-                if event_ts <= window_end_time_potential:
-                    events_in_window.append(events[j])
-                    sources_in_window.add(events[j]['source_ip'])
-                else:
-                    break
-
-            if len(events_in_window) >= DDOS_CONNECTION_THRESHOLD:
-                actual_window_duration = (events_in_window[-1]['timestamp'] - events_in_window[0]['timestamp']).total_seconds()
-                # Optional: Add a check for source IP diversity if desired for "DDoS"
-                # For a simple flood, high volume might be enough.
-                # For DDoS, we expect multiple sources: e.g. if len(sources_in_window) > SOME_DIVERSE_SOURCE_THRESHOLD
-
-                findings.append({
-                    'is_match': True,
-                    'confidence': 1.0, # High for signature match
-                    'rule_id': 'DDOS_FLOOD_DETECTED',
-                    'explanation': (
-                        f"Potential DDoS/Flood attack targeting {dest_ip}:{dest_port}. "
-                        f"{len(events_in_window)} connections/packets from {len(sources_in_window)} unique sources "
-                        f"observed between {events_in_window[0]['timestamp']} and {events_in_window[-1]['timestamp']} (Window: {actual_window_duration:.2f}s)."
-                    ),
-                    'details': {
-                        'destination_ip': dest_ip,
-                        'destination_port': dest_port,
-                        'event_count_in_window': len(events_in_window),
-                        'unique_source_ips_in_window': len(sources_in_window),
-                        'configured_threshold': DDOS_CONNECTION_THRESHOLD,
-                        'configured_window_seconds': DDOS_WINDOW_SECONDS,
-                        'first_event_time': events_in_window[0]['timestamp'].isoformat(),
-                        'last_event_time': events_in_window[-1]['timestamp'].isoformat()
-                    }
-                })
-                # Found a flood targeting this service. Break to avoid redundant alerts for same ongoing flood.
-                break
+        times_us = [e['t'] for e in events]
+        for start, end in _find_bursts(times_us, DDOS_WINDOW_SECONDS * _WINDOW_US, DDOS_CONNECTION_THRESHOLD):
+            events_in_window = events[start:end]
+            sources_in_window = {e['source_ip'] for e in events_in_window}
+            first_event_time = _as_datetime(events_in_window[0]['timestamp'])
+            last_event_time = _as_datetime(events_in_window[-1]['timestamp'])
+            actual_window_duration = (times_us[end - 1] - times_us[start]) / _WINDOW_US
+            # Optional: Add a check for source IP diversity if desired for "DDoS"
+            # For a simple flood, high volume might be enough.
+            # For DDoS, we expect multiple sources: e.g. if len(sources_in_window) > SOME_DIVERSE_SOURCE_THRESHOLD
+
+            findings.append(_ddos_finding(dest_ip, dest_port, len(events_in_window), sources_in_window,
+                                          first_event_time, last_event_time, actual_window_duration))
     return findings
 
 
 class SignatureEngine:
     def __init__(self):
+        # 'function' evaluates the rule's bucket from _bucket_session(), and only runs if 'precondition' holds for it;
+        # check_* wrap the same logic for raw sessions
         self.rules = [
-            {'id': 'SSH_BRUTE_FORCE', 'function': check_ssh_brute_force, 'description': 'Detects SSH brute-force attempts.'},
-            {'id': 'PORT_SCAN', 'function': check_port_scan, 'description': 'Detects port scanning activity.'},
-            {'id': 'DDOS_FLOOD', 'function': check_ddos_flood, 'description': 'Detects DDoS/flood activity.'},
+            {'id': 'SSH_BRUTE_FORCE', 'function': _evaluate_ssh_brute_force, 'bucket': 'ssh', 'precondition': _ssh_may_fire,
+             'description': 'Detects SSH brute-force attempts.'},
+            {'id': 'PORT_SCAN', 'function': _evaluate_port_scan, 'bucket': 'port_scan', 'precondition': _port_scan_may_fire,
+             'description': 'Detects port scanning activity.'},
+            {'id': 'DDOS_FLOOD', 'function': _evaluate_ddos_flood, 'bucket': 'ddos', 'precondition': _ddos_may_fire,
+             'description': 'Detects DDoS/flood activity.'},
         ]
-        # Initialize logger if needed, or use a global one
-        # self.logger = config.get_logger(__name__)
+        self._cache = OrderedDict() # session fingerprint -> findings, in LRU order
+        self._cache_lock = threading.Lock() # The pipeline runs sessions on threadpool workers
+        # Sliding-window state for ingest(), keyed like the _bucket_session() groupings
+        self._ssh_buf = defaultdict(deque) # (source_ip, port) -> deque[(t, timestamp)]
+        self._ports_buf = {} # (source_ip, dest_ip) -> (deque[(t, port, timestamp)], {port: count})
+        self._ddos_buf = defaultdict(deque) # (dest_ip, dest_port) -> deque[(t, source_ip, timestamp)]
+        self._last_emit = {} # (rule_id, *key) -> event time (epoch us) of the last finding ingest() returned
+        self._stream_lock = threading.Lock() # ingest() may be fed from several threads
+        self._stream_t = None # Latest event time ingested (epoch us); events behind it are dropped
+        self._last_sweep = None # Event time of the last _sweep_idle_keys()
+
+    @staticmethod
+    def _fingerprint(session_data):
+        """Digest of every rule input field, so only an identical session can hit the cache."""
+        return hashlib.blake2b(repr([(e.get('timestamp'), e.get('source_ip'), e.get('dest_ip'), e.get('dest_port'))
+                                     for e in session_data]).encode(), digest_size=16).digest()
 
     def analyze_session(self, session_data):
         """
@@ -281,23 +412,145 @@ class SignatureEngine:
         Returns:
             list: A list of all findings from all rules.
         """
+        fingerprint = self._fingerprint(session_data)
+        with self._cache_lock:
+            cached = self._cache.get(fingerprint)
+            if cached is not None:
+                self._cache.move_to_end(fingerprint)
+                return list(cached)
+
         all_findings = []
-        # self.logger.info(f"Analyzing session with {len(session_data)} events against {len(self.rules)} signature rules.")
-        print(f"Analyzing session with {len(session_data)} events against {len(self.rules)} signature rules.")
+        # %-style args: nothing is formatted unless DEBUG is enabled
+        logger.debug("Analyzing session with %d events against %d signature rules.", len(session_data), len(self.rules))
 
+        buckets = _bucket_session(session_data) # One pass over the events for all rules
 
         for rule in self.rules:
             try:
-                # self.logger.debug(f"Executing rule: {rule['id']}")
-                findings = rule['function'](session_data)
+                bucket = buckets[rule['bucket']]
+                if not rule['precondition'](bucket):
+                    continue
+                findings = rule['function'](bucket)
                 if findings:
-                    # self.logger.info(f"Rule '{rule['id']}' matched: {len(findings)} findings.")
                     all_findings.extend(findings)
-            except Exception as e:
-                # self.logger.error(f"Error executing rule {rule['id']}: {e}", exc_info=True)
-                print(f"Error executing rule {rule['id']}: {e}")
+            except Exception:
+                logger.exception("Error executing rule %s", rule['id'])
+
+        with self._cache_lock:
+            self._cache[fingerprint] = all_findings
+            if len(self._cache) > SESSION_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return list(all_findings)
+
+    def _should_emit(self, key, t):
+        """Records an ingest() finding for `key` at event time `t` unless one was reported within the cooldown."""
+        last = self._last_emit.get(key)
+        if last is not None and t - last < ALERT_COOLDOWN_SECONDS * _WINDOW_US:
+            return False
+        self._last_emit[key] = t
+        return True
+
+    def _sweep_idle_keys(self, t):
+        """
+        Drops per-key windows whose newest event has expired by event time `t` (any next event would empty
+        them anyway), and cooldown entries that have run out.
+        """
+        for buf, window_seconds in ((self._ssh_buf, SSH_BRUTE_FORCE_WINDOW_SECONDS),
+                                    (self._ddos_buf, DDOS_WINDOW_SECONDS)):
+            horizon = t - window_seconds * _WINDOW_US
+            for key in [key for key, events in buf.items() if not events or events[-1][0] < horizon]:
+                del buf[key]
+        horizon = t - PORT_SCAN_WINDOW_SECONDS * _WINDOW_US
+        for key in [key for key, (events, _) in self._ports_buf.items() if not events or events[-1][0] < horizon]:
+            del self._ports_buf[key]
+        # Past the cooldown an entry no longer suppresses anything
+        horizon = t - ALERT_COOLDOWN_SECONDS * _WINDOW_US
+        for key in [key for key, last in self._last_emit.items() if last <= horizon]:
+            del self._last_emit[key]
+
+    def ingest(self, event):
+        """
+        Streaming counterpart of analyze_session: keeps only the last window of events per key and
+        returns the findings this event completes, O(1) amortized per event. A burst is reported once,
+        when it reaches the threshold, and its events are then dropped so it isn't reported again;
+        further bursts for the same key within ALERT_COOLDOWN_SECONDS are consumed silently.
+        Opt-in and stateful: use one engine per event stream and feed each event once, in time order.
+        Events older than the latest one ingested, or more than STREAM_MAX_FUTURE_SECONDS ahead of the
+        wall clock, are dropped.
+        """
+        timestamp = event.get('timestamp')
+        if timestamp is None:
+            return []
+        try:
+            t = _epoch_us(timestamp)
+        except (TypeError, ValueError, OverflowError):
+            return []
+        # Naive timestamps may be local time or UTC, so allow whichever clock is further ahead
+        now_us = max(_epoch_us(time.time()), _epoch_us(datetime.datetime.now()))
+        if t > now_us + STREAM_MAX_FUTURE_SECONDS * _WINDOW_US:
+            logger.debug("ingest(): dropping event dated %s, ahead of the wall clock.", timestamp)
+            return []
+        with self._stream_lock:
+            if self._stream_t is not None and t < self._stream_t:
+                return [] # Late or resent event: the deques must stay in time order
+            return self._ingest_at(event, t)
+
+    def _ingest_at(self, event, t):
+        """ingest() body for an event at epoch-us time `t`, not behind _stream_t; the caller holds _stream_lock."""
+        self._stream_t = t
+        if self._last_sweep is None or t - self._last_sweep >= _STREAM_SWEEP_US:
+            self._sweep_idle_keys(t)
+            self._last_sweep = t
 
-        return all_findings
+        source_ip = event.get('source_ip')
+        dest_ip = event.get('dest_ip')
+        dest_port = event.get('dest_port')
+        timestamp = event.get('timestamp')
+        findings = []
+
+        if dest_port == SSH_BRUTE_FORCE_PORT and source_ip is not None:
+            key = (source_ip, dest_port)
+            attempts = self._ssh_buf[key]
+            attempts.append((t, timestamp))
+            while t - attempts[0][0] > SSH_BRUTE_FORCE_WINDOW_SECONDS * _WINDOW_US:
+                attempts.popleft()
+            if len(attempts) >= SSH_BRUTE_FORCE_ATTEMPTS_THRESHOLD:
+                if self._should_emit(('SSH_BRUTE_FORCE',) + key, t):
+                    findings.append(_ssh_finding(source_ip, dest_port, [_as_datetime(ts) for _, ts in attempts],
+                                                 (attempts[-1][0] - attempts[0][0]) / _WINDOW_US))
+                del self._ssh_buf[key]
+
+        if not all([source_ip, dest_ip, dest_port]):
+            return findings
+
+        key = (source_ip, dest_ip)
+        events, port_counts = self._ports_buf.setdefault(key, (deque(), defaultdict(int)))
+        events.append((t, dest_port, timestamp))
+        port_counts[dest_port] += 1
+        while t - events[0][0] > PORT_SCAN_WINDOW_SECONDS * _WINDOW_US:
+            _, old_port, _ = events.popleft()
+            port_counts[old_port] -= 1
+            if not port_counts[old_port]:
+                del port_counts[old_port]
+        if len(port_counts) >= PORT_SCAN_UNIQUE_PORTS_THRESHOLD:
+            if self._should_emit(('PORT_SCAN',) + key, t):
+                findings.append(_port_scan_finding(source_ip, dest_ip, set(port_counts), [_as_datetime(ts) for _, _, ts in events],
+                                                   (events[-1][0] - events[0][0]) / _WINDOW_US))
+            del self._ports_buf[key]
+
+        key = (dest_ip, dest_port)
+        events = self._ddos_buf[key]
+        events.append((t, source_ip, timestamp))
+        while t - events[0][0] > DDOS_WINDOW_SECONDS * _WINDOW_US:
+            events.popleft()
+        if len(events) >= DDOS_CONNECTION_THRESHOLD:
+            if self._should_emit(('DDOS_FLOOD_DETECTED',) + key, t):
+                findings.append(_ddos_finding(dest_ip, dest_port, len(events), {ip for _, ip, _ in events},
+                                              _as_datetime(events[0][2]), _as_datetime(events[-1][2]),
+                                              (events[-1][0] - events[0][0]) / _WINDOW_US))
+            del self._ddos_buf[key]
+
+        return findings
 
 # --- Example Usage (for testing this module) ---
 if __name__ == '__main__':
@@ -357,4 +610,20 @@ if __name__ == '__main__':
     # else:
     #     print("  No DDoS/Flood detected (or rule not active).")
 
+    print("\nTesting streaming ingest():")
+    stream = SignatureEngine()
+    base = now - datetime.timedelta(hours=2)
+    ssh_session = [{'timestamp': base + datetime.timedelta(seconds=s), 'source_ip': '10.0.0.3', 'dest_port': 22}
+                   for s in range(3)]
+    resent = [f for _ in range(2) for e in ssh_session for f in stream.ingest(e)]
+    print(f"  Same 3-attempt session sent twice: {len(resent)} finding(s) (expected 0)")
+    late = [f for s in range(-3600, -3590) for f in stream.ingest(
+        {'timestamp': base + datetime.timedelta(seconds=s), 'source_ip': '10.0.0.4', 'dest_port': 22})]
+    print(f"  Attempts an hour behind the stream: {len(late)} finding(s) (expected 0)")
+    future = stream.ingest({'timestamp': now + datetime.timedelta(days=1), 'source_ip': '10.0.0.5', 'dest_port': 22})
+    split = [f for s in range(10, 15) for f in stream.ingest(
+        {'timestamp': base + datetime.timedelta(seconds=s), 'source_ip': '10.0.0.6', 'dest_port': 22})]
+    print(f"  Future-dated event dropped: {not future and stream._stream_t < _epoch_us(now)}; "
+          f"5 later attempts: {len(split)} finding(s) (expected 1)")
+
     print("\nSignature Engine Test Complete.")
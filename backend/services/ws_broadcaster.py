@@ -1,42 +1,140 @@
 from fastapi import WebSocket
-from typing import List
+from typing import Any, List, Optional, Set
+import asyncio
+import json
 import logging
+try:
+    import orjson # Faster JSON for broadcast payloads; optional, falls back to json
+except ImportError:
+    orjson = None
 
 # It's better to use a standard logger instance
 logger = logging.getLogger("uvicorn.error") # Piggyback on uvicorn's logger
 
+# broadcast_json() payloads are coalesced into one frame per batch
+BROADCAST_BATCH_SIZE = 50
+BROADCAST_FLUSH_INTERVAL_SECONDS = 0.1
+
+def _json_default(obj: Any) -> Any:
+    """Hex-encodes bytes (e.g. HexBytes in contract event args), which neither JSON encoder handles."""
+    if isinstance(obj, (bytes, bytearray)):
+        return "0x" + bytes(obj).hex()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _encode(payload: Any) -> str:
+    if orjson:
+        return orjson.dumps(payload, default=_json_default).decode("utf-8")
+    return json.dumps(payload, separators=(",", ":"), default=_json_default)
+
 class ConnectionManager:
     """
     Manages active WebSocket connections for broadcasting messages.
     """
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        # A set gives O(1) add/discard; WebSocket objects hash by identity.
+        self.active_connections: Set[WebSocket] = set()
+        self._lock = asyncio.Lock() # Guards membership mutations only, never the sends themselves
+        self._count = 0 # Kept in step with active_connections so status checks don't touch the set
+        self._pending: Optional[asyncio.Queue] = None # broadcast_json() payloads, already encoded, awaiting flush_loop(); see _queue()
+
+    @property
+    def count(self) -> int:
+        """Number of connected clients."""
+        return self._count
 
     async def connect(self, websocket: WebSocket):
         """Accepts and stores a new WebSocket connection."""
         await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info(f"New WebSocket client connected: {websocket.client}. Total clients: {len(self.active_connections)}")
+        async with self._lock:
+            if websocket not in self.active_connections:
+                self.active_connections.add(websocket)
+                self._count += 1
+        logger.info(f"New WebSocket client connected: {websocket.client}. Total clients: {self._count}")
 
     def disconnect(self, websocket: WebSocket):
         """Removes a WebSocket connection."""
         if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-            logger.info(f"WebSocket client disconnected: {websocket.client}. Total clients: {len(self.active_connections)}")
+            self.active_connections.discard(websocket)
+            self._count -= 1
+            logger.info(f"WebSocket client disconnected: {websocket.client}. Total clients: {self._count}")
+
+    async def _safe_send(self, connection: WebSocket, message: str):
+        """Sends to a single client, dropping it if the socket has gone away."""
+        try:
+            await connection.send_text(message)
+        except Exception:
+            # WebSocketDisconnect / RuntimeError on a closed socket: assume the client is gone
+            self.disconnect(connection)
 
     async def broadcast(self, message: str):
         """
         Broadcasts a message to all active WebSocket connections.
         Handles disconnections that may occur during broadcast.
         """
-        logger.info(f"Broadcasting message to {len(self.active_connections)} client(s)...")
-        # A copy is made to handle cases where a client disconnects during broadcast
-        for connection in self.active_connections[:]:
+        # A snapshot is taken so clients disconnecting mid-broadcast don't mutate what we iterate
+        connections = tuple(self.active_connections)
+        logger.info(f"Broadcasting message to {len(connections)} client(s)...")
+        await asyncio.gather(*(self._safe_send(c, message) for c in connections))
+
+    def _queue(self) -> asyncio.Queue:
+        """Created on first use so it belongs to the server's running event loop, not the importer's."""
+        if self._pending is None:
+            self._pending = asyncio.Queue()
+        return self._pending
+
+    async def _broadcast_batch(self, encoded: List[str]):
+        """
+        Fans one text frame out to every client: a lone encoded payload as-is, several joined into
+        one JSON array. Frames stay text (not send_bytes) because the dashboards JSON.parse event.data directly.
+        """
+        message = encoded[0] if len(encoded) == 1 else "[" + ",".join(encoded) + "]"
+        await self.broadcast(message)
+
+    async def broadcast_json(self, payload: Any):
+        """
+        Encodes `payload` and queues it for the next coalesced frame sent by flush_loop(). Encoding here
+        means a payload that can't be serialized is dropped on its own rather than taking its batch with it.
+        """
+        if not self._count:
+            return # Nobody listening, nothing to queue
+        try:
+            encoded = _encode(payload)
+        except (TypeError, ValueError) as e: # orjson.JSONEncodeError subclasses TypeError
+            logger.error(f"Dropping broadcast payload that can't be serialized to JSON: {e}")
+            return
+        self._queue().put_nowait(encoded)
+
+    async def flush_loop(self):
+        """
+        Background task: waits for a payload, gathers more for up to BROADCAST_FLUSH_INTERVAL_SECONDS
+        or BROADCAST_BATCH_SIZE items, then sends them as one frame.
+        """
+        loop = asyncio.get_running_loop()
+        queue = self._queue()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + BROADCAST_FLUSH_INTERVAL_SECONDS
+            while len(batch) < BROADCAST_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
             try:
-                await connection.send_text(message)
-            except Exception:
-                # If sending fails, assume client disconnected and remove them
-                self.disconnect(connection)
+                await self._broadcast_batch(batch)
+            except Exception as e:
+                logger.error(f"Error broadcasting {len(batch)} queued message(s): {e}")
+
+    async def flush(self):
+        """Sends whatever is still queued, e.g. at shutdown."""
+        queue = self._queue()
+        while not queue.empty():
+            batch = []
+            while len(batch) < BROADCAST_BATCH_SIZE and not queue.empty():
+                batch.append(queue.get_nowait())
+            await self._broadcast_batch(batch)
 
 # Create a single, global instance of the manager to be used across the application
 manager = ConnectionManager()
@@ -44,6 +44,7 @@ LSTM_TRAIN_FILE = os.path.join(DATA_DIR, "lstm", "UNSW_NB15_training-set.csv")
 LSTM_TEST_FILE = os.path.join(DATA_DIR, "lstm", "UNSW_NB15_testing-set.csv")
 LSTM_MODEL_PATH = os.path.join(MODELS_DIR, "lstm_model.keras")
 LSTM_SCALER_PATH = os.path.join(MODELS_DIR, "scaler_lstm.pkl") # Standardized name
+LSTM_THRESHOLD_PATH = os.path.join(MODELS_DIR, "lstm_mse_threshold.pkl") # Fixed MSE threshold computed at training time
 
 # Model Evaluation Specific (example, might need more if datasets differ)
 EVAL_MONDAY_TEST_FILE = os.path.join(DATA_DIR, "evaluation", "Monday-WorkingHours-Test.pcap_ISCX.csv")
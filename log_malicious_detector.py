@@ -1,3 +1,4 @@
+import functools
 import joblib
 import numpy as np
 import tensorflow as tf
@@ -8,9 +9,18 @@ def load_models(scaler_path="models/scaler_unsw_nb15.pkl", lstm_model_path="mode
     return scaler, lstm_model
 
 def reshape_sequences(X, timesteps=10):
-    cut = (len(X) // timesteps) * timesteps
-    X = X[:cut]
-    return X.reshape(-1, timesteps, X.shape[1])
+    if len(X) < timesteps: # No full window; sliding_window_view would raise
+        return X[:0].reshape(0, timesteps, X.shape[1])
+    # Back-to-back windows as a strided view of X (no copy, even if X is a non-contiguous slice); trailing rows are dropped
+    return np.lib.stride_tricks.sliding_window_view(X, window_shape=(timesteps, X.shape[1]))[::timesteps, 0]
+
+@functools.lru_cache(maxsize=4)
+def _reconstruction_mse_fn(lstm_model, jit_compile=True):
+    """Mean reconstruction-MSE graph for `lstm_model`, built once and reused across calls (XLA-compiled by default)."""
+    @tf.function(jit_compile=jit_compile, reduce_retracing=True)
+    def mse_fn(x):
+        return tf.reduce_mean(tf.square(x - lstm_model(x, training=False)))
+    return mse_fn
 
 def detect_malicious_log(raw_log, scaler, lstm_model, threshold=0.01):
     """
@@ -28,8 +38,11 @@ def detect_malicious_log(raw_log, scaler, lstm_model, threshold=0.01):
     """
     X_scaled = scaler.transform(raw_log)
     X_seq = reshape_sequences(X_scaled, timesteps=10)
-    preds = lstm_model.predict(X_seq)
-    mse = np.mean(np.square(X_seq - preds))
+    x = tf.constant(X_seq, dtype=tf.float32)
+    try:
+        mse = float(_reconstruction_mse_fn(lstm_model)(x))
+    except tf.errors.InvalidArgumentError: # XLA rejected the model, run the same graph without it
+        mse = float(_reconstruction_mse_fn(lstm_model, jit_compile=False)(x))
     is_malicious = mse > threshold
     return is_malicious, mse
 
@@ -1,6 +1,11 @@
 import os
 import json
 import glob
+try:
+    import orjson # Faster parsing of feedback records; optional
+    _loads = orjson.loads # Raises orjson.JSONDecodeError, a json.JSONDecodeError subclass
+except ImportError:
+    _loads = json.loads
 import pandas as pd
 import argparse
 import logging
@@ -36,16 +41,41 @@ def collect_and_prepare_feedback_data():
     new_feedback_records = []
     newly_processed_files = []
 
-    feedback_files = glob.glob(os.path.join(FEEDBACK_LOGS_DIR, "feedback_*.json"))
+    # Daily JSONL files are appended to, so they're tracked as "name@byte_offset" instead of by name.
+    jsonl_offsets = {}
+    for entry in processed_files:
+        if '@' in entry:
+            name, offset = entry.rsplit('@', 1)
+            jsonl_offsets[name] = max(jsonl_offsets.get(name, 0), int(offset))
 
-    for filepath in feedback_files:
+    feedback_records = []
+    for filepath in sorted(glob.glob(os.path.join(FEEDBACK_LOGS_DIR, "feedback_*.jsonl"))):
+        filename = os.path.basename(filepath)
+        offset = start = jsonl_offsets.get(filename, 0)
+        with open(filepath, 'rb') as f:
+            f.seek(offset)
+            for raw_line in iter(f.readline, b''):
+                if not raw_line.endswith(b'\n'):
+                    break # Partially written record
+                offset += len(raw_line)
+                try:
+                    feedback_records.append((None, _loads(raw_line)))
+                except json.JSONDecodeError:
+                    logging.error(f"Error decoding JSON line in file: {filepath}. Skipping.")
+        if offset != start:
+            newly_processed_files.append(f"{filename}@{offset}")
+
+    for filepath in glob.glob(os.path.join(FEEDBACK_LOGS_DIR, "feedback_*.json")):
         filename = os.path.basename(filepath)
         if filename in processed_files:
             continue
+        with open(filepath, 'rb') as f:
+            try:
+                feedback_records.append((filename, _loads(f.read())))
+            except json.JSONDecodeError:
+                logging.error(f"Error decoding JSON from file: {filepath}. Skipping.")
 
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-
+    for filename, data in feedback_records:
         # We need to transform the feedback into a row that matches the training data format.
         # This is highly dependent on the feature set.
         # Let's assume 'original_features' contains the data.
@@ -67,7 +97,8 @@ def collect_and_prepare_feedback_data():
             continue
 
         new_feedback_records.append(features)
-        newly_processed_files.append(filename)
+        if filename:
+            newly_processed_files.append(filename)
 
     if newly_processed_files:
         with open(PROCESSED_FEEDBACK_TRACKER, 'a') as f:
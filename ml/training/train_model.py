@@ -6,17 +6,52 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
 from sklearn.preprocessing import LabelEncoder
+try:
+    # Optional: needed for Parquet datasets only
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
 
 # It's good practice to manage logging
 import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Rows read from a CSV to work out which of its columns are numeric
+CSV_SNIFF_ROWS = 1000
+
+def load_training_columns(dataset_path: str) -> pd.DataFrame:
+    """
+    Reads only the numeric feature columns plus 'label' from a CSV or Parquet (.parquet) dataset.
+    'attack_cat' and other non-numeric columns are skipped at read time instead of being parsed and dropped.
+    """
+    if dataset_path.endswith(".parquet"):
+        if pq is None:
+            raise ImportError("pyarrow is required to read Parquet datasets")
+        schema = pq.read_schema(dataset_path)
+        all_columns = schema.names
+        numeric = {field.name for field in schema if pa.types.is_integer(field.type) or pa.types.is_floating(field.type)}
+    else:
+        sample = pd.read_csv(dataset_path, nrows=CSV_SNIFF_ROWS)
+        all_columns = list(sample.columns)
+        numeric = set(sample.select_dtypes(include=['number']).columns)
+
+    columns = [col for col in all_columns if col == 'label' or (col in numeric and col != 'attack_cat')]
+    skipped = [col for col in all_columns if col not in columns and col != 'attack_cat']
+    if skipped:
+        logging.warning(f"Skipping {len(skipped)} non-numeric columns: {skipped}. "
+                        "Consider proper encoding for categorical features.")
+
+    if dataset_path.endswith(".parquet"):
+        return pd.read_parquet(dataset_path, columns=columns)
+    return pd.read_csv(dataset_path, usecols=columns)
+
 def train_model(dataset_path: str, save_dir: str):
     """
     Trains a RandomForestClassifier model on the given dataset and saves it.
 
     Args:
-        dataset_path (str): The full path to the training dataset (CSV).
+        dataset_path (str): The full path to the training dataset (CSV, or Parquet with a .parquet suffix).
         save_dir (str): The directory where the trained model and scaler will be saved.
     """
     logging.info(f"Starting model training with dataset: {dataset_path}")
@@ -26,7 +61,7 @@ def train_model(dataset_path: str, save_dir: str):
         return
 
     try:
-        df = pd.read_csv(dataset_path)
+        df = load_training_columns(dataset_path)
         logging.info(f"Dataset loaded successfully. Shape: {df.shape}")
     except Exception as e:
         logging.error(f"Failed to load dataset: {e}")
@@ -52,6 +87,7 @@ def train_model(dataset_path: str, save_dir: str):
     # Convert all categorical columns to numeric using one-hot encoding or label encoding
     # For simplicity, we select only numeric types and drop others.
     # A robust solution would handle categorical features properly.
+    # Non-numeric columns were already skipped at load; this catches CSV columns with text past the sniffed rows.
     X_numeric = X.select_dtypes(include=['number'])
     if X_numeric.shape[1] < X.shape[1]:
         logging.warning(f"Dropped {X.shape[1] - X_numeric.shape[1]} non-numeric columns. "
@@ -91,7 +127,7 @@ def train_model(dataset_path: str, save_dir: str):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Train a RandomForest model for ZeroHack.")
     parser.add_argument("--dataset", type=str, required=True,
-                        help="Path to the training dataset CSV file (e.g., 'ml/datasets/unsw_nb15/cleaned.csv').")
+                        help="Path to the training dataset CSV or Parquet file (e.g., 'ml/datasets/unsw_nb15/cleaned.csv').")
     parser.add_argument("--save-dir", type=str, required=True,
                         help="Directory to save the trained model (e.g., 'ml/models/v1').")
 
@@ -95,10 +95,8 @@ def reshape_sequences_eval(X, timesteps):
     if len(X) < timesteps:
         logger.warning(f"Not enough data ({len(X)} samples) to form even one sequence of {timesteps} timesteps.")
         return None
-    num_features = X.shape[1]
-    cut = (len(X) // timesteps) * timesteps
-    X_trimmed = X[:cut]
-    return X_trimmed.reshape(-1, timesteps, num_features)
+    # Back-to-back windows as a strided view of X (no copy, even if X is a non-contiguous slice); trailing rows are dropped
+    return np.lib.stride_tricks.sliding_window_view(X, window_shape=(timesteps, X.shape[1]))[::timesteps, 0]
 
 def evaluate_autoencoder(model_path_template, scaler_path_template, test_csv_path, model_id=""):
     """Evaluates a given autoencoder model."""
@@ -1,9 +1,14 @@
 import asyncio
+import functools
 import json
 import os
-from web3 import Web3
-from web3.middleware import geth_poa_middleware
-from typing import Optional
+from web3 import AsyncWeb3, Web3, WebsocketProviderV2
+from typing import Any, Optional
+
+try:
+    import orjson # Faster JSON (de)serialization; optional, falls back to json
+except ImportError:
+    orjson = None
 
 try:
     from dotenv import load_dotenv
@@ -16,45 +21,77 @@ import config
 logger = config.get_logger("websocket_listener")
 
 # --- Configuration ---
-# Note: Web3.py requires a WebSocket endpoint for event filtering (wss:// or ws://)
+# Note: log subscriptions (eth_subscribe) need a WebSocket endpoint (wss:// or ws://)
 WSS_RPC_URL = os.getenv("ZERO_HACK_BLOCKCHAIN_WSS_URL", "ws://127.0.0.1:8545")
 CONTRACT_ADDRESS_STR = os.getenv("ZERO_HACK_RESPONSE_CONTRACT_ADDRESS")
 ABI_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "blockchain", "ZeroHackResponseEngineABI.json")
 RECONNECT_DELAY_SECONDS = 10
+# Contract events pushed to us through a single "logs" subscription
+LISTENED_EVENTS = ("AdminAlert", "IPQuarantined")
+
+@functools.lru_cache(maxsize=8)
+def _load_abi(path: str, mtime: float) -> list:
+    """Parses the ABI once per (path, mtime), so reconnect loops don't re-read it; an edited file is picked up."""
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read()) if orjson else json.load(f)
 
-def get_contract_instance(w3: Web3) -> Optional[Any]:
+# Checksumming keccak-hashes the address, which never changes between reconnects
+_to_checksum_address = functools.lru_cache(maxsize=64)(Web3.to_checksum_address)
+
+def get_contract_instance(w3: AsyncWeb3) -> Optional[Any]:
     """Loads and returns a contract instance."""
     if not CONTRACT_ADDRESS_STR:
         logger.error("ZERO_HACK_RESPONSE_CONTRACT_ADDRESS not set.")
         return None
     try:
-        with open(ABI_FILE_PATH, 'r') as f:
-            abi = json.load(f)
-        checksum_address = w3.to_checksum_address(CONTRACT_ADDRESS_STR)
+        abi = _load_abi(ABI_FILE_PATH, os.path.getmtime(ABI_FILE_PATH))
+        checksum_address = _to_checksum_address(CONTRACT_ADDRESS_STR)
         return w3.eth.contract(address=checksum_address, abi=abi)
     except Exception as e:
         logger.error(f"Failed to load contract instance: {e}")
         return None
 
-async def event_listener_log_loop(event_filter, poll_interval_seconds: int):
-    """The loop that polls for new events and logs them."""
-    while True:
+def _event_topic(event_abi: dict) -> str:
+    """topic0 of an event: keccak of its canonical signature, e.g. IPQuarantined(string,uint256)."""
+    signature = f"{event_abi['name']}({','.join(i['type'] for i in event_abi['inputs'])})"
+    return Web3.to_hex(Web3.keccak(text=signature))
+
+def log_event(event: Any):
+    """Logs a decoded contract event."""
+    logger.info(f"--- New Event Received: {event.event} ---")
+    logger.info(f"  Transaction Hash: {event.transactionHash.hex()}")
+    logger.info(f"  Block Number: {event.blockNumber}")
+    # Pretty print event arguments
+    if orjson:
+        formatted_args = orjson.dumps(dict(event.args), option=orjson.OPT_INDENT_2).decode("utf-8")
+    else:
+        formatted_args = json.dumps(dict(event.args), indent=2)
+    logger.info(f"  Event Data:\n{formatted_args}")
+    logger.info("----------------------------------------")
+
+async def event_subscription_loop(w3: AsyncWeb3, contract: Any):
+    """
+    Subscribes once to the contract's LISTENED_EVENTS logs and logs each event as the node pushes it.
+    Returns when the socket closes; errors propagate so main_listener() can reconnect.
+    """
+    events_by_topic = {}
+    for name in LISTENED_EVENTS:
+        event = getattr(contract.events, name)()
+        events_by_topic[_event_topic(event.abi)] = event
+
+    # Topics in a nested list are OR-ed, so one subscription covers every listened event
+    subscription_id = await w3.eth.subscribe("logs", {"address": contract.address, "topics": [list(events_by_topic)]})
+    logger.info(f"Subscribed to {', '.join(LISTENED_EVENTS)} (subscription {subscription_id}). Listening for new events...")
+
+    async for response in w3.ws.process_subscriptions():
+        log = response["result"]
+        event = events_by_topic.get(Web3.to_hex(log["topics"][0]))
+        if event is None:
+            continue
         try:
-            for event in event_filter.get_new_entries():
-                logger.info(f"--- New Event Received: {event.event} ---")
-                logger.info(f"  Transaction Hash: {event.transactionHash.hex()}")
-                logger.info(f"  Block Number: {event.blockNumber}")
-                # Pretty print event arguments
-                formatted_args = json.dumps(dict(event.args), indent=2)
-                logger.info(f"  Event Data:\n{formatted_args}")
-                logger.info("----------------------------------------")
-
-            await asyncio.sleep(poll_interval_seconds)
-
+            log_event(event.process_log(log))
         except Exception as e:
-            logger.error(f"Error in event polling loop: {e}", exc_info=True)
-            # Break the loop to allow the main loop to handle reconnection
-            break
+            logger.error(f"Could not decode log in transaction {Web3.to_hex(log['transactionHash'])}: {e}")
 
 async def main_listener():
     """Main function to establish connection and manage the event listener loop."""
@@ -66,40 +103,21 @@ async def main_listener():
     while True: # Main reconnection loop
         try:
             logger.info(f"Attempting to connect to WebSocket provider at {WSS_RPC_URL}...")
-            w3 = Web3(Web3.WebsocketProvider(WSS_RPC_URL))
-            w3.middleware_onion.inject(geth_poa_middleware, layer=0)
-
-            if not w3.is_connected():
-                raise ConnectionError("Initial connection failed.")
-            logger.info("Successfully connected to WebSocket provider.")
-
-            contract = get_contract_instance(w3)
-            if not contract:
-                logger.error("Could not load contract. Retrying after delay...")
-                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
-                continue
-
-            # Create filters for the events we care about
-            # We can listen to multiple events. For this demo, let's listen to two.
-            admin_alert_filter = contract.events.AdminAlert.create_filter(fromBlock='latest')
-            ip_quarantined_filter = contract.events.IPQuarantined.create_filter(fromBlock='latest')
-
-            logger.info("Event filters created for AdminAlert and IPQuarantined. Listening for new events...")
-
-            # Run two listeners concurrently
-            listener_task_1 = asyncio.create_task(event_listener_log_loop(admin_alert_filter, 2))
-            listener_task_2 = asyncio.create_task(event_listener_log_loop(ip_quarantined_filter, 2))
-
-            # This will run until one of the listeners exits due to an error
-            done, pending = await asyncio.wait(
-                [listener_task_1, listener_task_2],
-                return_when=asyncio.FIRST_COMPLETED,
-            )
-
-            # If a task completed (likely due to error), cancel others and restart the main loop
-            for task in pending:
-                task.cancel()
-            logger.warning("Listener loop exited. Attempting to reconnect...")
+            # Persistent connection: the node pushes matching logs, nothing is polled
+            async with AsyncWeb3.persistent_websocket(WebsocketProviderV2(WSS_RPC_URL)) as w3:
+                if not await w3.is_connected():
+                    raise ConnectionError("Initial connection failed.")
+                logger.info("Successfully connected to WebSocket provider.")
+
+                contract = get_contract_instance(w3)
+                if not contract:
+                    logger.error("Could not load contract. Retrying after delay...")
+                    await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+                    continue
+
+                # This will run until the socket closes or an error is raised
+                await event_subscription_loop(w3, contract)
+            logger.warning("Subscription ended. Attempting to reconnect...")
 
         except ConnectionRefusedError:
             logger.error("Connection refused. Is the Ethereum node running and the WebSocket endpoint enabled?")
@@ -77,9 +77,12 @@ const IncidentsPage = () => {
       console.log("WebSocket message received:", event.data);
       // Assuming the message is a JSON string with event details
       try {
-        const messageData = JSON.parse(event.data);
-        // You can add a toast notification here
-        console.log(`Real-time alert: ${messageData.event_type}`, messageData.data);
+        const parsed = JSON.parse(event.data);
+        // The server coalesces bursts of events into one frame holding an array
+        for (const messageData of Array.isArray(parsed) ? parsed : [parsed]) {
+          // You can add a toast notification here
+          console.log(`Real-time alert: ${messageData.event_type}`, messageData.data);
+        }
 
         // Trigger a refresh of the incident list to show the new data
         fetchIncidents();
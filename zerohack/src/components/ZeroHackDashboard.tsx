@@ -102,23 +102,26 @@ export default function ZeroHackDashboard() {
 
     ws.onmessage = (event) => {
       try {
-        const messageData = JSON.parse(event.data);
-        console.log("Dashboard received WebSocket message:", messageData);
-
-        // Update dashboard based on message type
-        // This part needs to be built out. For example, if we get a new threat alert,
-        // we might increment the threatsDetected count.
-        if (messageData.event_type === 'IPQuarantined' || messageData.event_type === 'AdminAlert') {
-          setSystemStatus(prevStatus => ({
-            ...prevStatus,
-            threatsDetected: prevStatus.threatsDetected + 1,
-            // quarantinedItems could also be updated if we get that info
-            lastUpdateTimestamp: new Date().toISOString(),
-          }));
-        }
-        // A 'system_status' type message could update everything at once
-        if (messageData.event_type === 'system_status') {
-             setSystemStatus(messageData.data);
+        const parsed = JSON.parse(event.data);
+        // The server coalesces bursts of events into one frame holding an array
+        for (const messageData of Array.isArray(parsed) ? parsed : [parsed]) {
+          console.log("Dashboard received WebSocket message:", messageData);
+
+          // Update dashboard based on message type
+          // This part needs to be built out. For example, if we get a new threat alert,
+          // we might increment the threatsDetected count.
+          if (messageData.event_type === 'IPQuarantined' || messageData.event_type === 'AdminAlert') {
+            setSystemStatus(prevStatus => ({
+              ...prevStatus,
+              threatsDetected: prevStatus.threatsDetected + 1,
+              // quarantinedItems could also be updated if we get that info
+              lastUpdateTimestamp: new Date().toISOString(),
+            }));
+          }
+          // A 'system_status' type message could update everything at once
+          if (messageData.event_type === 'system_status') {
+               setSystemStatus(messageData.data);
+          }
         }
 
       } catch (e) {
@@ -556,8 +556,10 @@ export function ThreatMap() {
     const ws = new WebSocket(ALERTS_WEBSOCKET_ENDPOINT);
 
     ws.onmessage = (event) => {
-      const messageData = JSON.parse(event.data);
-      if (messageData.event_type === 'IPQuarantined' || messageData.event_type === 'AdminAlert') {
+      const parsed = JSON.parse(event.data);
+      // The server coalesces bursts of events into one frame holding an array
+      const messages = Array.isArray(parsed) ? parsed : [parsed];
+      if (messages.some(m => m.event_type === 'IPQuarantined' || m.event_type === 'AdminAlert')) {
         // A new threat has been detected and logged. Re-fetch the incidents.
         fetchThreats();
       }
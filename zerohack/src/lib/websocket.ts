@@ -142,18 +142,22 @@ export function useWebSocket(url: string, options: WebSocketOptions = {}) {
 
       ws.onmessage = (event) => {
         try {
-          const wsEvent = JSON.parse(event.data) as WebSocketEvent;
+          const parsed = JSON.parse(event.data);
+          // The server coalesces bursts of events into one frame holding an array
+          const wsEvents = (Array.isArray(parsed) ? parsed : [parsed]) as WebSocketEvent[];
           
           // Update the events state
-          setEvents((prev) => [...prev.slice(-99), wsEvent]);
-          setLastEvent(wsEvent);
+          setEvents((prev) => [...prev, ...wsEvents].slice(-100));
+          setLastEvent(wsEvents[wsEvents.length - 1]);
           
           // Notify type-specific listeners
-          if (wsEvent.type in listenersRef.current) {
-            const listeners = listenersRef.current[wsEvent.type as keyof typeof listenersRef.current];
-            listeners.forEach((listener) => {
-              listener(wsEvent.data as any);
-            });
+          for (const wsEvent of wsEvents) {
+            if (wsEvent.type in listenersRef.current) {
+              const listeners = listenersRef.current[wsEvent.type as keyof typeof listenersRef.current];
+              listeners.forEach((listener) => {
+                listener(wsEvent.data as any);
+              });
+            }
           }
         } catch (error) {
           console.error('Error parsing WebSocket message', error);